@@ -2,10 +2,23 @@
 # repo_function_deepdive.py
 # Analyze functions per file, build related-function groups, and generate ~3000-word Markdown deep dives via OpenAI.
 
-import os, re, ast, sys, json, time, math, argparse, textwrap, traceback
+import io, os, re, ast, sys, json, time, math, bisect, codecs, shutil, asyncio, hashlib, argparse, textwrap, traceback, contextlib
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional, Iterable, Set
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Tuple, Optional, Iterable, Set, FrozenSet, NamedTuple
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+
+try:  # optional: JIT-compiled JS brace matcher (pip install numba)
+    import numpy as np
+    from numba import njit
+except ImportError:
+    np = None
+    njit = None
+
+try:  # optional: tree-sitter JS/TS parsing (pip install tree_sitter tree_sitter_javascript tree_sitter_typescript)
+    from tree_sitter import Language, Parser
+except ImportError:
+    Language = Parser = None
 
 # ========== CLI ==========
 def parse_args():
@@ -15,115 +28,172 @@ def parse_args():
     p.add_argument("--model", default=os.environ.get("OPENAI_MODEL", "gpt-4o"),
                    help="OpenAI model name (default: gpt-4o). Override with --model or OPENAI_MODEL env.")
     p.add_argument("--max-workers", type=int, default=3, help="Max concurrent OpenAI calls.")
+    p.add_argument("--parse-workers", type=int, default=os.cpu_count() or 1, help="Processes used to read, parse and group files.")
     p.add_argument("--max-file-bytes", type=int, default=600_000, help="Skip files larger than this many bytes.")
     p.add_argument("--follow-symlinks", action="store_true", help="Follow symlinks when walking.")
     p.add_argument("--dry-run", action="store_true", help="Parse & group only; do not call OpenAI.")
+    p.add_argument("--no-cache", action="store_true", help="Ignore the response cache in <out>/.cache and always call OpenAI.")
     p.add_argument("--include", nargs="*", default=[".py", ".js", ".ts", ".tsx", ".jsx"], help="File extensions to include.")
     p.add_argument("--exclude-dirs", nargs="*", default=[".git","node_modules","venv",".venv","build","dist","target","Pods","DerivedData","__pycache__","coverage",".mypy_cache",".pytest_cache",".idea",".vscode"],
                    help="Directories to skip.")
     p.add_argument("--max-snippet-chars", type=int, default=14_000, help="Max chars of code to embed per group (keeps prompt safe).")
     p.add_argument("--group-word-target", type=int, default=3000, help="Target words per group report.")
-    p.add_argument("--rate-limit-sleep", type=float, default=1.0, help="Seconds to sleep between API calls (simple throttle).")
+    p.add_argument("--max-requests-per-minute", type=float, default=60, help="Token-bucket limit on OpenAI requests per minute.")
+    p.add_argument("--max-tokens-per-minute", type=float, default=150_000, help="Token-bucket limit on (estimated) OpenAI tokens per minute.")
     return p.parse_args()
 
 # ========== Utilities ==========
+BOM_ENCODINGS = [(codecs.BOM_UTF8, "utf-8"), (codecs.BOM_UTF16_LE, "utf-16-le"), (codecs.BOM_UTF16_BE, "utf-16-be")]
+BINARY_SNIFF_BYTES = 8192
+
 def read_text(path: Path, max_bytes: int) -> Optional[str]:
+    """Decode a source file in one pass; None if too large, binary or unreadable.
+    The encoding comes from a BOM when present, else UTF-8 with U+FFFD for bad bytes."""
     try:
-        if path.stat().st_size > max_bytes:
-            return None
-        data = path.read_bytes()
-        for enc in ("utf-8","utf-16","latin-1"):
-            try:
-                return data.decode(enc)
-            except Exception:
-                continue
+        with path.open("rb") as fh:
+            if os.fstat(fh.fileno()).st_size > max_bytes:
+                return None
+            data = fh.read()
     except Exception:
         return None
-    return None
+    for bom, enc in BOM_ENCODINGS:
+        if data.startswith(bom):
+            return data[len(bom):].decode(enc, errors="replace")
+    if b"\0" in data[:BINARY_SNIFF_BYTES]:
+        return None  # binary
+    return data.decode("utf-8", errors="replace")
 
 def human_join(strings: List[str], sep=", ", last_sep=" and "):
     if not strings: return ""
     if len(strings) == 1: return strings[0]
     return sep.join(strings[:-1]) + last_sep + strings[-1]
 
+# ========== Function table ==========
+@dataclass(slots=True)
+class FuncTable:
+    """A file's functions as parallel arrays (SoA) indexed by integer id; ids follow sorted name order."""
+    names: List[str] = field(default_factory=list)
+    starts: List[int] = field(default_factory=list)  # 1-based first line
+    ends: List[int] = field(default_factory=list)    # 1-based last line
+    srcs: List[str] = field(default_factory=list)
+    calls: List[FrozenSet[str]] = field(default_factory=list)  # raw callee names, may be external
+    name_to_id: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, int, int, str, Set[str]]]) -> "FuncTable":
+        """Build from (name, start, end, src, calls) rows with unique names."""
+        t = cls()
+        for name, start, end, src, calls in sorted(rows, key=lambda r: r[0]):
+            t.name_to_id[name] = len(t.names)
+            t.names.append(name)
+            t.starts.append(start)
+            t.ends.append(end)
+            t.srcs.append(src)
+            t.calls.append(frozenset(calls))
+        return t
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def edges(self) -> List[List[int]]:
+        """Sorted callee ids per function, restricted to functions defined in this file."""
+        ids = self.name_to_id
+        return [sorted({ids[c] for c in calls if c in ids}) for calls in self.calls]
+
 # ========== PYTHON PARSER ==========
-class PyFunction:
-    def __init__(self, name: str, start: int, end: int, src: str, calls: Set[str]):
-        self.name = name
-        self.start = start
-        self.end = end
-        self.src = src
-        self.calls = set(calls)
-
-def parse_python_functions(code: str) -> Dict[str, PyFunction]:
-    """Return {func_name: PyFunction} using AST; include list of function calls found inside."""
-    funcs: Dict[str, PyFunction] = {}
-    try:
-        tree = ast.parse(code)
-    except Exception:
-        return funcs
-
-    # Collect functions with spans
-    for node in ast.walk(tree):
-        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            name = node.name
-            # line numbers are 1-based; end_lineno exists in 3.8+
-            start = getattr(node, "lineno", 1)
-            end = getattr(node, "end_lineno", start)
-            # Grab source segment (fallback to slicing by lines)
-            try:
-                segment = ast.get_source_segment(code, node)
-            except Exception:
-                segment = "\n".join(code.splitlines()[start-1:end])
-            funcs[name] = PyFunction(name, start, end, segment or "", set())
-
-    # Build a simple call list by scanning Name/Attribute nodes inside each func body
-    class CallVisitor(ast.NodeVisitor):
-        def __init__(self, current: str):
-            self.current = current
-            self.calls: Set[str] = set()
-        def visit_Call(self, node: ast.Call):
-            # cases: foo(), obj.foo()
+
+def _byte_slice(line: str, lo: int, hi: Optional[int]) -> str:
+    """line[lo:hi] with lo/hi as UTF-8 byte offsets, which is what the AST column offsets are."""
+    if line.isascii():
+        return line[lo:hi]
+    return line.encode("utf-8")[lo:hi].decode("utf-8", errors="replace")
+
+class FileVisitor(ast.NodeVisitor):
+    """Single pass over a module: function spans, calls made inside each function, and imports."""
+    def __init__(self, code: str):
+        # split exactly like the tokenizer does (\n, \r\n, \r) so AST line numbers index correctly
+        self.lines = io.StringIO(code, newline="").readlines()
+        self.spans: Dict[str, Tuple[int, int, str]] = {}  # name -> (start, end, src); last definition wins
+        self.calls: Dict[str, Set[str]] = {}              # name -> callees, merged across same-named defs
+        self.imports: List[str] = []
+        self.func_stack: List[str] = []
+
+    def _visit_func(self, node):
+        name = node.name
+        # line numbers are 1-based; end_lineno exists in 3.8+
+        start = node.lineno
+        end = getattr(node, "end_lineno", None) or start
+        # slice the cached line list instead of ast.get_source_segment (which re-scans the source per call)
+        seg_lines = self.lines[start-1:end]
+        col = node.col_offset  # UTF-8 byte offsets of `def` on the first line and of the body's end on the last
+        end_col = getattr(node, "end_col_offset", None)
+        if len(seg_lines) == 1:
+            seg_lines = [_byte_slice(seg_lines[0], col, end_col)]
+        elif seg_lines:
+            seg_lines = [_byte_slice(seg_lines[0], col, None), *seg_lines[1:-1], _byte_slice(seg_lines[-1], 0, end_col)]
+        segment = "".join(seg_lines).rstrip("\r\n")
+        self.spans[name] = (start, end, segment)
+        self.calls.setdefault(name, set())
+        self.func_stack.append(name)
+        self.generic_visit(node)
+        self.func_stack.pop()
+
+    visit_FunctionDef = _visit_func
+    visit_AsyncFunctionDef = _visit_func
+
+    def visit_Call(self, node: ast.Call):
+        if self.func_stack:
+            # cases: foo(), obj.foo() (record attribute .attr, best-effort)
             fn = node.func
             if isinstance(fn, ast.Name):
-                self.calls.add(fn.id)
+                self.calls[self.func_stack[-1]].add(fn.id)
             elif isinstance(fn, ast.Attribute):
-                # record attribute .attr (best-effort)
-                self.calls.add(fn.attr)
-            self.generic_visit(node)
+                self.calls[self.func_stack[-1]].add(fn.attr)
+        self.generic_visit(node)
 
-    for node in ast.walk(tree):
-        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-            cur = node.name
-            v = CallVisitor(cur)
-            v.visit(node)
-            if cur in funcs:
-                funcs[cur].calls |= v.calls
+    def visit_Import(self, node: ast.Import):
+        self.imports.extend(a.name for a in node.names)
 
-    return funcs
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if node.module:
+            self.imports.append(node.module)
+
+def parse_python_file(tree: ast.AST, code: str) -> Tuple[FuncTable, List[str]]:
+    """Return (FuncTable, imports) from one visitor pass over an already-parsed tree.
+    Calls are attributed to the innermost enclosing function."""
+    v = FileVisitor(code)
+    v.visit(tree)
+    return FuncTable.from_rows((n, *span, v.calls[n]) for n, span in v.spans.items()), v.imports
 
 # ========== JS/TS PARSER ==========
-JS_FUNC_PATTERNS = [
+# One alternation so the source is scanned once; the named group that matched is the kind.
+JS_FUNC_RE = re.compile(
     # function foo(...)
-    (re.compile(r"\bfunction\s+([A-Za-z0-9_]+)\s*\(", re.MULTILINE), "decl"),
+    r"\bfunction\s+(?P<decl>[A-Za-z0-9_]+)\s*\("
     # const foo = (...) => { ... } OR function expression assigned
-    (re.compile(r"\b(?:const|let|var)\s+([A-Za-z0-9_]+)\s*=\s*\([^\)]*\)\s*=>\s*{", re.MULTILINE), "arrow"),
-    (re.compile(r"\b(?:const|let|var)\s+([A-Za-z0-9_]+)\s*=\s*function\s*\(", re.MULTILINE), "expr"),
-    # class methods (simple)
-    (re.compile(r"\b([A-Za-z0-9_]+)\s*\([^)]*\)\s*{", re.MULTILINE), "method_hint"),  # filtered later
-]
-
-JS_CALL_RE = re.compile(r"\b([A-Za-z_][A-Za-z0-9_]*)\s*\(", re.MULTILINE)
-
-class JsFunction:
-    def __init__(self, name: str, start_idx: int, end_idx: int, start_line: int, end_line: int, src: str, calls: Set[str]):
-        self.name = name
-        self.start_idx = start_idx
-        self.end_idx = end_idx
-        self.start_line = start_line
-        self.end_line = end_line
-        self.src = src
-        self.calls = set(calls)
+    r"|\b(?:const|let|var)\s+(?P<arrow>[A-Za-z0-9_]+)\s*=\s*\([^\)]*\)\s*=>\s*{"
+    r"|\b(?:const|let|var)\s+(?P<expr>[A-Za-z0-9_]+)\s*=\s*function\s*\("
+    # class header up to its body brace; methods are only looked for inside class bodies
+    r"|\bclass\s+(?P<cls>[A-Za-z0-9_$]+)[^{;]*{",
+    re.MULTILINE | re.ASCII)
+
+# class methods (simple); applied to class body spans only, where it cannot flood the file with false positives
+JS_METHOD_RE = re.compile(r"\b([A-Za-z0-9_]+)\s*\([^)]*\)\s*{", re.MULTILINE | re.ASCII)
+JS_KEYWORDS = {"if","for","while","switch","catch","return","function"}
+
+JS_CALL_RE = re.compile(r"\b([A-Za-z_][A-Za-z0-9_]*)\s*\(", re.MULTILINE | re.ASCII)
+
+# JS parsers collect candidates as (start_idx, end_idx, start_line, end_line, src, calls) per name,
+# keeping the widest span when a name repeats, then hand them to FuncTable.from_rows.
+JsCandidate = Tuple[int, int, int, int, str, Set[str]]
+
+def _js_table(seen: Dict[str, JsCandidate]) -> FuncTable:
+    return FuncTable.from_rows((name, c[2], c[3], c[4], c[5]) for name, c in seen.items())
+
+def _keep_widest(seen: Dict[str, JsCandidate], name: str, cand: JsCandidate):
+    # avoid overwriting same name with a shorter span
+    if name not in seen or (seen[name][1] - seen[name][0]) < (cand[1] - cand[0]):
+        seen[name] = cand
 
 def _brace_span(code: str, start_brace_idx: int) -> int:
     """Return index of matching closing brace from start_brace_idx; -1 if not found."""
@@ -152,155 +222,369 @@ def _brace_span(code: str, start_brace_idx: int) -> int:
         i += 1
     return -1
 
-def _line_no(code: str, idx: int) -> int:
-    return code.count("\n", 0, idx) + 1
+if njit is not None:
+    @njit(cache=True)
+    def _brace_span_nb(buf, start_brace_idx: int) -> int:
+        """_brace_span over a uint8 view of ASCII source (byte index == str index)."""
+        depth = 0
+        in_str = 0
+        esc = False
+        for i in range(start_brace_idx, buf.shape[0]):
+            ch = buf[i]
+            if in_str != 0:
+                if esc:
+                    esc = False
+                elif ch == 92:      # backslash
+                    esc = True
+                elif ch == in_str:
+                    in_str = 0
+            else:
+                if ch == 39 or ch == 34 or ch == 96:  # ' " `
+                    in_str = ch
+                elif ch == 123:     # {
+                    depth += 1
+                elif ch == 125:     # }
+                    depth -= 1
+                    if depth == 0:
+                        return i
+        return -1
+else:
+    _brace_span_nb = None
+
+def _line_starts(code: str) -> List[int]:
+    """Sorted offsets at which each line begins; computed once per file."""
+    return [0] + [m.end() for m in re.finditer("\n", code)]
+
+def _line_no(line_starts: List[int], idx: int) -> int:
+    return bisect.bisect_right(line_starts, idx)
+
+# tree-sitter node types that define a named function
+TS_FUNC_NODES = {"function_declaration", "generator_function_declaration", "method_definition"}
+# values that turn `const foo = ...` into a function
+TS_FUNC_VALUES = {"arrow_function", "function_expression", "function", "generator_function"}
+
+_TS_PARSERS: Dict[str, object] = {}
+
+def _ts_parser(ext: str):
+    """Cached tree-sitter parser for a JS/TS extension; None when the bindings/grammars are unavailable."""
+    if ext in _TS_PARSERS:
+        return _TS_PARSERS[ext]
+    parser = None
+    if Parser is not None:
+        try:
+            if ext in (".ts", ".tsx"):
+                import tree_sitter_typescript as tsts
+                lang = Language(tsts.language_tsx() if ext == ".tsx" else tsts.language_typescript())
+            else:
+                import tree_sitter_javascript as tsjs
+                lang = Language(tsjs.language())
+            parser = Parser(lang)
+        except Exception:
+            parser = None
+    _TS_PARSERS[ext] = parser
+    return parser
+
+def _parse_js_functions_ts(parser, code: str) -> FuncTable:
+    """One C-level parse, then one walk collecting named functions and the calls made inside them.
+    Like the regex parser, a call inside a nested function also counts for the enclosing ones."""
+    src = code.encode("utf-8", errors="replace")
+    text = lambda n: src[n.start_byte:n.end_byte].decode("utf-8", errors="replace")
+    seen: Dict[str, JsCandidate] = {}
+    open_calls: List[Set[str]] = []  # call sets of the functions enclosing the current node
+    stack = [(parser.parse(src).root_node, False)]
+    while stack:
+        node, leaving = stack.pop()
+        if leaving:
+            open_calls.pop()
+            continue
+        t = node.type
+        name_node = None
+        span = node
+        if t in TS_FUNC_NODES:
+            name_node = node.child_by_field_name("name")
+        elif t == "variable_declarator":
+            value = node.child_by_field_name("value")
+            if value is not None and value.type in TS_FUNC_VALUES:
+                name_node = node.child_by_field_name("name")
+                # include the `const`/`let`/`var` keyword when the declaration holds just this function
+                parent = node.parent
+                if parent is not None and parent.named_child_count == 1:
+                    span = parent
+        elif t == "call_expression":
+            fn = node.child_by_field_name("function")
+            if fn is not None and fn.type == "member_expression":
+                fn = fn.child_by_field_name("property")
+            if fn is not None and fn.type.endswith("identifier"):
+                callee = text(fn)
+                for calls in open_calls:
+                    calls.add(callee)
 
-def parse_js_functions(code: str) -> Dict[str, JsFunction]:
-    seen: Dict[str, JsFunction] = {}
-    for rx, kind in JS_FUNC_PATTERNS:
-        for m in rx.finditer(code):
-            name = m.group(1)
-            if not name:
-                continue
-            # find the opening brace following this match
-            brace_idx = code.find("{", m.end())
-            if brace_idx == -1:
-                continue
-            end_idx = _brace_span(code, brace_idx)
-            if end_idx == -1:
+        if name_node is not None and name_node.type.endswith("identifier"):
+            calls: Set[str] = set()  # filled in as the walk visits the body
+            _keep_widest(seen, text(name_node), (span.start_byte, span.end_byte, span.start_point[0] + 1,
+                                                 span.end_point[0] + 1, text(span), calls))
+            open_calls.append(calls)
+            stack.append((node, True))
+        stack.extend((c, False) for c in reversed(node.children))
+    return _js_table(seen)
+
+def parse_js_functions(code: str, ext: str=".js") -> FuncTable:
+    """Use tree-sitter when installed; otherwise fall back to regex matching + brace walking."""
+    parser = _ts_parser(ext)
+    if parser is not None:
+        return _parse_js_functions_ts(parser, code)
+
+    seen: Dict[str, JsCandidate] = {}
+    # byte buffer for the JIT matcher, built once per file; non-ASCII source keeps the Python loop
+    buf = None
+    if _brace_span_nb is not None and code.isascii():
+        buf = np.frombuffer(code.encode("ascii"), dtype=np.uint8)
+    line_starts = _line_starts(code)
+    def add(name: str, start: int, brace_idx: int):
+        if brace_idx == -1:
+            return
+        end_idx = _brace_span_nb(buf, brace_idx) if buf is not None else _brace_span(code, brace_idx)
+        if end_idx == -1:
+            return
+        # collect calls inside the function body
+        calls = set()
+        for cm in JS_CALL_RE.finditer(code, brace_idx, end_idx+1):
+            callee = cm.group(1)
+            if callee not in JS_KEYWORDS:
+                calls.add(callee)
+        _keep_widest(seen, name, (start, end_idx+1, _line_no(line_starts, start),
+                                  _line_no(line_starts, end_idx+1), code[start:end_idx+1], calls))
+
+    for m in JS_FUNC_RE.finditer(code):
+        kind = m.lastgroup
+        if kind == "cls":
+            body_end = _brace_span_nb(buf, m.end()-1) if buf is not None else _brace_span(code, m.end()-1)
+            if body_end == -1:
                 continue
-            src = code[m.start():end_idx+1]
-            jf = JsFunction(
-                name=name,
-                start_idx=m.start(),
-                end_idx=end_idx+1,
-                start_line=_line_no(code, m.start()),
-                end_line=_line_no(code, end_idx+1),
-                src=src,
-                calls=set()
-            )
-            # collect calls inside the function body
-            body = code[brace_idx:end_idx+1]
-            calls = set()
-            for cm in JS_CALL_RE.finditer(body):
-                callee = cm.group(1)
-                if callee not in {"if","for","while","switch","return","function"}:
-                    calls.add(callee)
-            jf.calls = calls
-            # avoid overwriting same name with a shorter span
-            if name not in seen or (seen[name].end_idx - seen[name].start_idx) < (jf.end_idx - jf.start_idx):
-                seen[name] = jf
-    return seen
+            for mm in JS_METHOD_RE.finditer(code, m.end(), body_end):
+                if mm.group(1) not in JS_KEYWORDS:
+                    add(mm.group(1), mm.start(), mm.end()-1)
+            continue
+        # the opening brace is at or after the last matched char (arrow matches end on it)
+        add(m.group(kind), m.start(), code.find("{", m.end()-1))
+    return _js_table(seen)
 
 # ========== Grouping (Connected Components) ==========
-def build_groups(names: List[str], edges: Dict[str, Set[str]]) -> List[Set[str]]:
-    """Undirected connected components: names are nodes, edges are calls between known names."""
-    graph: Dict[str, Set[str]] = {n:set() for n in names}
-    for a, neigh in edges.items():
+def build_groups(n: int, edges: List[List[int]]) -> List[List[int]]:
+    """Undirected connected components over function ids 0..n-1; edges[i] are the callees of i.
+    Union-find with path halving and union by size, so grouping is near-linear in V+E.
+    Each group lists its ids in ascending order."""
+    parent = list(range(n))
+    size = [1] * n
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, neigh in enumerate(edges):
         for b in neigh:
-            if b in graph and b != a:
-                graph[a].add(b)
-                graph[b].add(a)
-    seen: Set[str] = set()
-    groups: List[Set[str]] = []
-    for n in names:
-        if n in seen: continue
-        stack = [n]
-        comp = set()
-        while stack:
-            cur = stack.pop()
-            if cur in seen: continue
-            seen.add(cur)
-            comp.add(cur)
-            stack.extend(sorted(graph[cur] - seen))
-        groups.append(comp)
+            ra, rb = find(a), find(b)
+            if ra == rb:
+                continue
+            if size[ra] < size[rb]:
+                ra, rb = rb, ra
+            parent[rb] = ra
+            size[ra] += size[rb]
+
+    comps: Dict[int, List[int]] = {}
+    for i in range(n):
+        comps.setdefault(find(i), []).append(i)
+    groups = list(comps.values())
     # Sort largest first
-    groups.sort(key=lambda g: (-len(g), sorted(g)[0] if g else ""))
+    groups.sort(key=lambda g: (-len(g), g[0]))
     return groups
 
 # ========== Repo Walk ==========
 def list_code_files(root: Path, include_exts: List[str], exclude_dirs: List[str], follow_symlinks: bool) -> List[Path]:
+    """Iterative os.scandir walk: DirEntry type checks reuse the cached d_type, and
+    rejected files are filtered by suffix on the bare name without building a Path."""
+    exts = tuple(include_exts)
+    excludes = frozenset(exclude_dirs)
     files: List[Path] = []
-    for r, dirs, fnames in os.walk(root, followlinks=follow_symlinks):
-        # prune
-        dirs[:] = [d for d in dirs if d not in exclude_dirs]
-        for f in fnames:
-            p = Path(r) / f
-            if p.suffix.lower() in include_exts:
-                files.append(p)
+    stack = [str(root)]
+    while stack:
+        d = stack.pop()
+        try:
+            it = os.scandir(d)
+        except OSError:
+            continue
+        with it:
+            for e in it:
+                name = e.name
+                try:
+                    is_dir = e.is_dir(follow_symlinks=follow_symlinks)
+                except OSError:
+                    continue
+                if is_dir:
+                    # prune
+                    if name not in excludes:
+                        stack.append(e.path)
+                elif name.lower().endswith(exts):
+                    files.append(Path(e.path))
     return files
 
 # ========== OpenAI Client ==========
 def get_openai_client():
     """
-    Works with the official 'openai' Python SDK v1+.
+    Works with the official 'openai' Python SDK v1+ (async client).
     pip install --upgrade openai
     """
     try:
-        from openai import OpenAI
+        from openai import AsyncOpenAI
     except Exception as e:
         print("[error] You need the official 'openai' package: pip install --upgrade openai", file=sys.stderr)
         raise
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY env var not set.")
-    return OpenAI(api_key=api_key)
-
-def call_openai(client, model: str, sys_prompt: str, user_prompt: str, retries: int=3) -> str:
+    return AsyncOpenAI(api_key=api_key)
+
+class RateLimiter:
+    """Token bucket over requests/min and tokens/min, shared by all in-flight calls
+    (same scheme as the OpenAI cookbook's api_request_parallel_processor)."""
+    def __init__(self, max_requests_per_minute: float, max_tokens_per_minute: float):
+        self.rpm = max(1.0, float(max_requests_per_minute))
+        self.tpm = max(1.0, float(max_tokens_per_minute))
+        self.req_avail = self.rpm
+        self.tok_avail = self.tpm
+        self.last = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.last
+        self.last = now
+        self.req_avail = min(self.rpm, self.req_avail + elapsed * self.rpm / 60.0)
+        self.tok_avail = min(self.tpm, self.tok_avail + elapsed * self.tpm / 60.0)
+
+    async def acquire(self, tokens: int):
+        tokens = min(tokens, self.tpm)  # a single oversized call must still get through eventually
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.req_avail >= 1 and self.tok_avail >= tokens:
+                    self.req_avail -= 1
+                    self.tok_avail -= tokens
+                    return
+                await asyncio.sleep(60.0 / self.rpm)
+
+def estimate_tokens(*texts: str) -> int:
+    # ~4 chars per token is close enough for budgeting
+    return sum(len(t) for t in texts) // 4 + 1
+
+def prompt_cache_key(model: str, sys_prompt: str, user_prompt: str) -> str:
+    return hashlib.blake2b("\0".join((model, sys_prompt, user_prompt)).encode("utf-8"), digest_size=16).hexdigest()
+
+async def call_openai(client, model: str, sys_prompt: str, user_prompt: str, md_path: Path,
+                      sem: asyncio.Semaphore, limiter: RateLimiter, cache_dir: Optional[Path]=None,
+                      completion_tokens: int=0, retries: int=4):
+    """Stream the response straight into md_path (and the cache entry) as it is generated.
+    Identical (model, prompts) are copied from cache_dir when given; only complete responses are cached."""
+    cache_path = None
+    if cache_dir is not None:
+        cache_path = cache_dir / f"{prompt_cache_key(model, sys_prompt, user_prompt)}.md"
+        try:
+            shutil.copyfile(cache_path, md_path)
+            return
+        except FileNotFoundError:
+            pass
     last_err = None
     for i in range(retries):
-        try:
-            resp = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role":"system","content":sys_prompt},
-                    {"role":"user","content":user_prompt},
-                ],
-                temperature=0.2,
-            )
-            return resp.choices[0].message.content
-        except Exception as e:
-            last_err = e
-            time.sleep(1.5 * (i+1))
+        async with sem:
+            await limiter.acquire(estimate_tokens(sys_prompt, user_prompt) + completion_tokens)
+            tmp = cache_path.with_suffix(".tmp") if cache_path is not None else None
+            try:
+                stream = await client.chat.completions.create(
+                    model=model,
+                    messages=[
+                        {"role":"system","content":sys_prompt},
+                        {"role":"user","content":user_prompt},
+                    ],
+                    temperature=0.2,
+                    stream=True,
+                )
+                with contextlib.ExitStack() as stack:
+                    outs = [stack.enter_context(open(md_path, "w", encoding="utf-8"))]
+                    if tmp is not None:
+                        outs.append(stack.enter_context(open(tmp, "w", encoding="utf-8")))
+                    async for event in stream:
+                        delta = event.choices[0].delta.content if event.choices else None
+                        if delta:
+                            for fh in outs:
+                                fh.write(delta)
+            except Exception as e:
+                last_err = e
+                if tmp is not None:
+                    tmp.unlink(missing_ok=True)
+            else:
+                if tmp is not None:
+                    os.replace(tmp, cache_path)  # never leave a half-written entry behind
+                return
+        if i < retries - 1:
+            await asyncio.sleep(2 ** i)  # exponential backoff: 1s -> 2s -> 4s
     raise last_err
 
 # ========== Report Prompt ==========
+MAX_PROMPT_IMPORTS = 20
+IDENT_RE = re.compile(r"[A-Za-z_$][A-Za-z0-9_$]*", re.ASCII)
+
+def _import_stem(module: str) -> str:
+    """Name a module is most likely referenced by: `os.path` -> os, `./utils/api.js` -> api."""
+    if "/" in module:
+        return module.rstrip("/").rsplit("/", 1)[-1].split(".")[0]
+    return module.split(".")[0]
+
 def make_group_prompt(repo_root: Path,
                       file_path: Path,
                       language: str,
-                      imports: List[str],
+                      imports: List[str],  # sorted, de-duplicated once per file
                       group_funcs: List[Tuple[str, str]],  # (name, src)
-                      callers: Dict[str, Set[str]],
-                      callees: Dict[str, Set[str]],
-                      target_words: int) -> Tuple[str,str]:
+                      callers: Dict[str, List[str]],  # sorted
+                      callees: Dict[str, List[str]],  # sorted
+                      target_words: int,
+                      max_snippet_chars: int) -> Tuple[str,str]:
     sys_prompt = (
         "You are a senior staff software engineer and code analyst. "
         "Write clear, deeply technical, and precise explanations."
     )
 
-    # Trim combined snippets to keep prompt reasonable
-    total_chars = sum(len(src) for _, src in group_funcs)
+    # Trim combined snippets to keep prompt reasonable. Callers split groups to fit beforehand, so this
+    # only bites on a single function larger than the cap, which is truncated rather than dropped.
     group_funcs_sorted = sorted(group_funcs, key=lambda x: (-len(x[1]), x[0]))
 
     snippets: List[Tuple[str,str]] = []
     cap = 0
     for name, src in group_funcs_sorted:
-        if cap + len(src) > 14000:  # extra safety guard outside CLI
+        if not snippets and len(src) > max_snippet_chars:
+            src = src[:max_snippet_chars] + "\n... [truncated]"
+        elif cap + len(src) > max_snippet_chars:
             continue
         snippets.append((name, src))
         cap += len(src)
 
+    # only list imports this group's code plausibly uses, capped to keep the prompt small
+    idents = set(IDENT_RE.findall("\n".join(src for _, src in snippets).lower()))
+    used = [i for i in imports if _import_stem(i).lower() in idents][:MAX_PROMPT_IMPORTS]
     imports_block = ""
-    if imports:
-        imports_block = "Imports detected: " + ", ".join(sorted(set(imports))) + "\n"
+    if used:
+        imports_block = "Imports detected: " + ", ".join(used) + "\n"
 
     # Describe relationships
     rel_lines = []
     for name, _ in group_funcs:
-        cs = sorted(callees.get(name, []))
-        rs = sorted(callers.get(name, []))
+        cs = callees.get(name, [])
+        rs = callers.get(name, [])
         rel_lines.append(f"- {name}: calls [{', '.join(cs) if cs else '—'}]; called by [{', '.join(rs) if rs else '—'}]")
 
+    snippets_md = "".join(f"\n#### Function `{name}`\n```{language}\n{src}\n```\n" for name, src in snippets)
+
     user_prompt = f"""
 Analyze the following {language} code from a single repository: **{file_path.relative_to(repo_root)}**.
 
@@ -321,150 +605,192 @@ Your task:
 Provide an honest technical critique—if something is unclear or risky, say so and propose fixes.
 
 ### Code Snippets
-{"".join([f"\n#### Function `{name}`\n```{language}\n{src}\n```\n" for name, src in snippets])}
+{snippets_md}
 """.strip()
     return sys_prompt, user_prompt
 
 # ========== Per-file Analysis ==========
+JS_IMPORT_RE = re.compile(r"\bimport\s+(?:.+?\s+from\s+)?['\"]([^'\"]+)['\"]|require\(\s*['\"]([^'\"]+)['\"]\s*\)")
+
 def extract_imports(language: str, code: str) -> List[str]:
     if language == "python":
-        res = []
         try:
             tree = ast.parse(code)
-            for n in ast.walk(tree):
-                if isinstance(n, ast.Import):
-                    res.extend([a.name for a in n.names])
-                elif isinstance(n, ast.ImportFrom):
-                    res.append(n.module or "")
         except Exception:
-            pass
-        return [x for x in res if x]
+            return []
+        return parse_python_file(tree, code)[1]
     else:
-        # JS/TS
-        imports = re.findall(r"\bimport\s+(?:.+?\s+from\s+)?['\"]([^'\"]+)['\"]", code)
-        reqs = re.findall(r"require\(\s*['\"]([^'\"]+)['\"]\s*\)", code)
-        return [*imports, *reqs]
-
-def analyze_file(repo_root: Path, p: Path, max_bytes: int, model: str, client, outdir: Path,
-                 max_snippet_chars: int, target_words: int, dry_run: bool) -> List[str]:
-    """Returns list of generated md file paths."""
+        # JS/TS: ES imports and require() calls in one scan, in source order
+        return [m.group(1) or m.group(2) for m in JS_IMPORT_RE.finditer(code)]
+
+class GroupJob(NamedTuple):
+    """One group report to produce: everything the OpenAI stage needs, nothing it has to parse."""
+    path: Path          # source file
+    group: str          # 1-based group number within the file, plus _a/_b/... for parts of a split group
+    names: List[str]    # sorted function names in the group
+    sys_prompt: str
+    user_prompt: str
+    md_path: Path
+
+def pack_group(ids: List[int], sizes: List[int], cap: int) -> List[List[int]]:
+    """Split a group into parts whose code totals <= cap chars (first-fit decreasing).
+    A function larger than cap gets a part of its own. Parts list ids in ascending order."""
+    parts: List[List[int]] = []
+    loads: List[int] = []
+    for i in sorted(ids, key=lambda i: -sizes[i]):
+        for k, load in enumerate(loads):
+            if load + sizes[i] <= cap:
+                parts[k].append(i)
+                loads[k] += sizes[i]
+                break
+        else:
+            parts.append([i])
+            loads.append(sizes[i])
+    return [sorted(part) for part in parts]
+
+def _part_suffix(k: int) -> str:
+    """0 -> a, 25 -> z, 26 -> aa, ..."""
+    out = ""
+    k += 1
+    while k:
+        k, r = divmod(k - 1, 26)
+        out = chr(ord("a") + r) + out
+    return out
+
+def prepare_file(repo_root: Path, p: Path, max_bytes: int, outdir: Path,
+                 max_snippet_chars: int, target_words: int) -> List[GroupJob]:
+    """Read, parse, group and build prompts for one file. CPU-bound and OpenAI-free, so it runs in a worker process."""
     code = read_text(p, max_bytes)
     if code is None:
-        print(f"[skip] large or unreadable: {p}", file=sys.stderr)
+        print(f"[skip] large, binary or unreadable: {p}", file=sys.stderr)
         return []
     ext = p.suffix.lower()
     language = "python" if ext == ".py" else "javascript"
 
-    generated: List[str] = []
-    imports = extract_imports(language, code)
+    prompts: List[Tuple[str, List[str], str, str]] = []  # (group label, names, sys_prompt, user_prompt)
 
     if language == "python":
-        funcs = parse_python_functions(code)  # name -> PyFunction
-        names = sorted(funcs.keys())
-        if not names:
+        # ast.parse is the dominant per-file cost: do it exactly once and share the tree
+        try:
+            tree = ast.parse(code)
+        except Exception:
             return []
-        # Build edges within known functions
-        edges: Dict[str, Set[str]] = {n:set() for n in names}
-        for n, f in funcs.items():
-            for c in f.calls:
-                if c in funcs:
-                    edges[n].add(c)
-        groups = build_groups(names, edges)
-        # reverse map (callers)
-        callers: Dict[str, Set[str]] = {n:set() for n in names}
-        for a, nbrs in edges.items():
-            for b in nbrs:
-                callers[b].add(a)
-        # per group: call OpenAI
-        base_dir = outdir / p.stem
-        base_dir.mkdir(parents=True, exist_ok=True)
-        for idx, g in enumerate(groups, start=1):
-            group_funcs = [(n, funcs[n].src) for n in sorted(g)]
-            # trim snippets to fit
-            # compute callees for only group
-            sub_edges = {n: set(sorted(edges.get(n, set()) & g)) for n in g}
-            sub_callers = {n: set(sorted(callers.get(n, set()) & g)) for n in g}
-            sys_p, user_p = make_group_prompt(repo_root, p, "python", imports, group_funcs, sub_callers, sub_edges, target_words)
-
-            md_path = base_dir / f"group_{idx}.md"
-            if dry_run:
-                md_path.write_text(f"# DRY RUN: {p.name} / group {idx}\n\nFunctions: {', '.join(sorted(g))}\n")
-                generated.append(str(md_path))
-                continue
-
-            try:
-                content = call_openai(client, model, sys_p, user_p)
-            except Exception as e:
-                print(f"[error] OpenAI call failed for {p} group {idx}: {e}", file=sys.stderr)
-                # write a stub with error info for traceability
-                stub = f"# ERROR for {p.name} group {idx}\n\n{traceback.format_exc()}"
-                md_path.write_text(stub)
-                generated.append(str(md_path))
-                continue
-
-            md_path.write_text(content)
-            generated.append(str(md_path))
-            time.sleep(args.rate_limit_sleep)
-        return generated
-
+        table, imports = parse_python_file(tree, code)
     else:
         # JS/TS
-        jmap = parse_js_functions(code)  # name -> JsFunction
-        names = sorted(jmap.keys())
-        if not names:
-            return []
-        edges: Dict[str, Set[str]] = {n:set() for n in names}
-        for n, f in jmap.items():
-            for c in f.calls:
-                if c in jmap:
-                    edges[n].add(c)
-        groups = build_groups(names, edges)
-        callers: Dict[str, Set[str]] = {n:set() for n in names}
-        for a, nbrs in edges.items():
-            for b in nbrs:
-                callers[b].add(a)
-
-        base_dir = outdir / p.stem
-        base_dir.mkdir(parents=True, exist_ok=True)
-        for idx, g in enumerate(groups, start=1):
-            group_funcs = [(n, jmap[n].src) for n in sorted(g)]
-            sub_edges = {n: set(sorted(edges.get(n, set()) & g)) for n in g}
-            sub_callers = {n: set(sorted(callers.get(n, set()) & g)) for n in g}
-
-            # Trim big groups by code size to keep prompt reasonable
-            total = 0
-            trimmed: List[Tuple[str,str]] = []
-            for name, src in sorted(group_funcs, key=lambda x: (-len(x[1]), x[0])):
-                if total + len(src) > max_snippet_chars:
-                    continue
-                trimmed.append((name, src))
-                total += len(src)
-
-            sys_p, user_p = make_group_prompt(repo_root, p, "javascript", imports, trimmed, sub_callers, sub_edges, target_words)
+        imports = extract_imports(language, code)
+        table = parse_js_functions(code, ext)
+    if not len(table):
+        return []
+    imports = sorted(set(imports))
+
+    # Integer-keyed call graph; ids follow sorted names, so sorted ids are sorted names
+    names = table.names
+    edges = table.edges()
+    groups = build_groups(len(table), edges)  # each group already sorted
+    # reverse map (callers); visiting callers in id order keeps every list sorted
+    callers: List[List[int]] = [[] for _ in names]
+    for a, nbrs in enumerate(edges):
+        for b in nbrs:
+            callers[b].append(a)
+
+    sizes = [len(src) for src in table.srcs]
+    for idx, g in enumerate(groups, start=1):
+        # a group is a connected component, so callees/callers of its members never leave it
+        sub_edges = {names[i]: [names[j] for j in edges[i]] for i in g}
+        sub_callers = {names[i]: [names[j] for j in callers[i]] for i in g}
+
+        # Oversized groups become several prompts instead of one that silently drops functions
+        parts = [g] if sum(sizes[i] for i in g) <= max_snippet_chars else pack_group(g, sizes, max_snippet_chars)
+        for k, part in enumerate(parts):
+            label = str(idx) if len(parts) == 1 else f"{idx}_{_part_suffix(k)}"
+            group_funcs = [(names[i], table.srcs[i]) for i in part]
+            sys_p, user_p = make_group_prompt(repo_root, p, language, imports, group_funcs, sub_callers, sub_edges,
+                                              target_words, max_snippet_chars)
+            prompts.append((label, [names[i] for i in part], sys_p, user_p))
+
+    base_dir = outdir / p.stem
+    base_dir.mkdir(parents=True, exist_ok=True)
+    return [GroupJob(p, label, g, sys_p, user_p, base_dir / f"group_{label}.md") for label, g, sys_p, user_p in prompts]
+
+def _init_worker(include_exts: List[str]):
+    """Per-process warm-up: regexes are compiled at import; build the tree-sitter parsers once here too."""
+    for ext in include_exts:
+        if ext != ".py":
+            _ts_parser(ext)
+
+async def write_group_report(job: GroupJob, model: str, client, dry_run: bool, sem: asyncio.Semaphore,
+                             limiter: RateLimiter, cache_dir: Optional[Path], completion_tokens: int) -> str:
+    p, group, md_path = job.path, job.group, job.md_path
+    if dry_run:
+        md_path.write_text(f"# DRY RUN: {p.name} / group {group}\n\nFunctions: {', '.join(job.names)}\n")
+        return str(md_path)
 
-            md_path = base_dir / f"group_{idx}.md"
-            if dry_run:
-                md_path.write_text(f"# DRY RUN: {p.name} / group {idx}\n\nFunctions: {', '.join(sorted(g))}\n")
-                generated.append(str(md_path))
-                continue
+    try:
+        await call_openai(client, model, job.sys_prompt, job.user_prompt, md_path, sem, limiter, cache_dir, completion_tokens)
+    except Exception as e:
+        print(f"[error] OpenAI call failed for {p} group {group}: {e}", file=sys.stderr)
+        # write a stub with error info for traceability
+        stub = f"# ERROR for {p.name} group {group}\n\n{traceback.format_exc()}"
+        md_path.write_text(stub)
+        return str(md_path)
+
+    return str(md_path)
+
+async def analyze_file(pool: ProcessPoolExecutor, repo_root: Path, p: Path, max_bytes: int, model: str, client,
+                       outdir: Path, max_snippet_chars: int, target_words: int, dry_run: bool,
+                       sem: asyncio.Semaphore, limiter: RateLimiter, cache_dir: Optional[Path]) -> List[str]:
+    """Returns list of generated md file paths. Parsing runs in `pool`; all group prompts of the file are issued concurrently."""
+    loop = asyncio.get_running_loop()
+    jobs = await loop.run_in_executor(pool, prepare_file, repo_root, p, max_bytes, outdir,
+                                      max_snippet_chars, target_words)
+    # rough completion budget for the token bucket (~1.4 tokens per English word)
+    completion_tokens = int(target_words * 1.4)
+    return list(await asyncio.gather(*(
+        write_group_report(job, model, client, dry_run, sem, limiter, cache_dir, completion_tokens)
+        for job in jobs)))
 
-            try:
-                content = call_openai(client, model, sys_p, user_p)
-            except Exception as e:
-                print(f"[error] OpenAI call failed for {p} group {idx}: {e}", file=sys.stderr)
-                stub = f"# ERROR for {p.name} group {idx}\n\n{traceback.format_exc()}"
-                md_path.write_text(stub)
-                generated.append(str(md_path))
-                continue
+# ========== MAIN ==========
+async def main_async(args, repo_root: Path, outdir: Path, files: List[Path]) -> List[str]:
+    client = None
+    if not args.dry_run:
+        client = get_openai_client()
+    # one gate for every in-flight OpenAI call across all files
+    sem = asyncio.Semaphore(max(1, args.max_workers))
+    limiter = RateLimiter(args.max_requests_per_minute, args.max_tokens_per_minute)
+    cache_dir = None
+    if not args.no_cache:
+        cache_dir = outdir / ".cache"
+        cache_dir.mkdir(parents=True, exist_ok=True)
+
+    # parsing is CPU-bound: spread it over processes, and overlap it with the OpenAI calls of earlier files
+    include_exts = [e.lower() for e in args.include]
+    pool = ProcessPoolExecutor(max_workers=max(1, args.parse_workers),
+                               initializer=_init_worker, initargs=(include_exts,))
+
+    async def run(p: Path) -> List[str]:
+        try:
+            md_paths = await analyze_file(pool, repo_root, p, args.max_file_bytes, args.model, client,
+                                          outdir, args.max_snippet_chars, args.group_word_target,
+                                          args.dry_run, sem, limiter, cache_dir)
+        except Exception as e:
+            print(f"[error] {p}: {e}", file=sys.stderr)
+            return []
+        if md_paths:
+            print(f"[ok] {p.name}: wrote {len(md_paths)} group reports")
+        return md_paths
 
-            md_path.write_text(content)
-            generated.append(str(md_path))
-            time.sleep(args.rate_limit_sleep)
-        return generated
+    generated_all: List[str] = []
+    try:
+        for md_paths in await asyncio.gather(*(run(p) for p in files)):
+            generated_all.extend(md_paths)
+    finally:
+        pool.shutdown()
+        if client is not None:
+            await client.close()
+    return generated_all
 
-# ========== MAIN ==========
 def main():
-    global args
     args = parse_args()
     repo_root = Path(args.root).expanduser().resolve()
     if not repo_root.exists():
@@ -487,26 +813,9 @@ def main():
     if len(files) > 10:
         print(f"  … (+{len(files)-10} more)")
 
-    client = None
-    if not args.dry_run:
-        client = get_openai_client()
-
-    generated_all: List[str] = []
-    with ThreadPoolExecutor(max_workers=max(1, args.max_workers)) as ex:
-        futs = {ex.submit(analyze_file, repo_root, p, args.max_file_bytes, args.model, client,
-                          outdir, args.max_snippet_chars, args.group_word_target, args.dry_run): p
-                for p in files}
-        for fut in as_completed(futs):
-            p = futs[fut]
-            try:
-                md_paths = fut.result()
-                if md_paths:
-                    print(f"[ok] {p.name}: wrote {len(md_paths)} group reports")
-                    generated_all.extend(md_paths)
-            except Exception as e:
-                print(f"[error] {p}: {e}", file=sys.stderr)
+    generated_all = asyncio.run(main_async(args, repo_root, outdir, files))
 
     print(f"\nDone. Wrote {len(generated_all)} Markdown files to {outdir}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,39 +1,68 @@
 #!/usr/bin/env python3
 # repo_intel.py
-# Strict version: discover .git dirs only via `find / -type d -name ".git" 2>/dev/null`,
-# then analyze each repo and write reports. No caching, no extra flags.
+# Strict version: discover .git dirs with a parallel os.scandir walk of the whole filesystem,
+# then analyze each repo (while discovery continues) and write reports. Per-file results are cached in
+# SQLite so unchanged files are skipped on later runs. No extra flags.
 
 import os
 import re
 import ast
 import csv
 import json
+import mmap
 import sys
-import subprocess
+import queue
+import sqlite3
+import threading
+import multiprocessing
+import configparser
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import List, Dict, Tuple, Iterable, Optional
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import List, Dict, Tuple, Callable, Iterable, Iterator, Optional, Union
+
+try:  # optional: SIMD multi-pattern prefilter for the regex analyzers
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+try:  # optional: faster JSON for the per-repo JSONL artifacts
+    import orjson
+except ImportError:
+    orjson = None
+
+try:  # optional: tree-sitter symbol extraction (pip install tree_sitter + the tree_sitter_<lang> grammars)
+    import importlib
+    from tree_sitter import Language, Parser, Query
+    try:
+        from tree_sitter import QueryCursor  # tree_sitter >= 0.25
+    except ImportError:
+        QueryCursor = None
+except ImportError:
+    Parser = None
 
 # ========================== Config ==========================
 OUT_DIR = Path("./repo_reports3")
 MAX_BYTES = 300_000          # per-file size cap
-WORKERS = 4                  # analysis threads
-SKIP_BINARIES = True
+MMAP_MIN_BYTES = 64 * 1024   # files at least this big are mmap'd instead of read into a bytes copy
+WORKERS = os.cpu_count() or 4  # analysis processes (parsing is CPU-bound)
+FILE_WORKERS = 8             # reader threads per repo, overlapping file I/O with parsing
 FOLLOW_SYMLINKS = False
+USE_TREE_SITTER = True       # precise symbols where a grammar is installed; False = regex analyzers only
+
+DISCOVERY_ROOT = "/"
+DISCOVERY_WORKERS = 16       # directory-listing threads (discovery is I/O-bound)
+ONE_FILESYSTEM = False       # True: never cross into another mount (like `find -xdev`)
+PSEUDO_FS_DIRS = {"/proc", "/sys", "/dev"}  # kernel/virtual trees that never hold repos
 
 DEFAULT_IGNORE_DIRS = {
     ".git", ".yarn", ".gradle", ".idea", ".vscode", ".venv", "venv", "env", "node_modules",
     "Pods", "build", "dist", "target", "__pycache__", ".mypy_cache", ".pytest_cache",
     ".dart_tool", ".expo", "DerivedData"
 }
+_FROZEN_IGNORE = frozenset(DEFAULT_IGNORE_DIRS)
 
-BINARY_EXTS = {
-    ".png",".jpg",".jpeg",".gif",".webp",".ico",".bmp",".tiff",".pdf",".zip",".gz",".bz2",".xz",
-    ".7z",".dmg",".apk",".aab",".ipa",".mp3",".wav",".mp4",".mov",".m4a",".ogg",".webm",
-    ".jar",".war",".class",".o",".a",".so",".dylib",".dll",".bin",".iso"
-}
-
-CODE_EXTS = {
+CODE_EXTS = frozenset({
     # Python
     ".py",
     # JavaScript/TypeScript
@@ -48,256 +77,615 @@ CODE_EXTS = {
     ".c",".h",".hpp",".hh",".cc",".cpp",".cxx",
     # Shell
     ".sh",".bash",".zsh"
-}
+})
 
 # ========================== Discovery ==========================
 
-def discover_git_dirs_strict() -> List[str]:
+def iter_git_dirs(root: str = DISCOVERY_ROOT, workers: int = DISCOVERY_WORKERS) -> Iterator[str]:
     """
-    Run exactly: find / -type d -name ".git" 2>/dev/null
-    Return list of absolute .git directory paths.
+    Parallel breadth-first os.scandir walk from `root`, yielding absolute .git paths (directories or
+    gitlink files) as they are found. A directory holding .git is a repo and is not descended into further;
+    DEFAULT_IGNORE_DIRS and PSEUDO_FS_DIRS are pruned.
     """
-    print("[discovery] running: find / -type d -name \".git\" 2>/dev/null", file=sys.stderr)
     try:
-        # Build one string and use shell to allow 2>/dev/null redirection
-        cmd = 'find / -type d -name ".git" 2>/dev/null'
-        cp = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=False)
-        out = [line.strip() for line in cp.stdout.splitlines() if line.strip()]
-    except Exception as e:
-        print(f"[discovery] ERROR running find: {e}", file=sys.stderr)
-        out = []
-    print(f"[discovery] found {len(out)} repos", file=sys.stderr)
-    # Print each path to terminal
-    for p in out:
+        root_dev = os.stat(root).st_dev
+    except OSError:
+        return
+    work: "queue.Queue[Optional[str]]" = queue.Queue()
+    found: "queue.Queue[Optional[str]]" = queue.Queue()
+
+    def scan(d: str):
+        try:
+            with os.scandir(d) as it:
+                entries = list(it)
+        except OSError:
+            return
+        subdirs = []
+        for e in entries:
+            name = e.name
+            if name == ".git":  # a directory, or a `gitdir:` file for worktrees/submodules
+                found.put(e.path)
+                return  # a repo: no need to walk its working tree or .git internals
+            try:
+                if not e.is_dir(follow_symlinks=False):
+                    continue
+            except OSError:
+                continue
+            if name in _FROZEN_IGNORE or e.path in PSEUDO_FS_DIRS:
+                continue
+            if ONE_FILESYSTEM:
+                try:
+                    if e.stat(follow_symlinks=False).st_dev != root_dev:
+                        continue
+                except OSError:
+                    continue
+            subdirs.append(e.path)
+        for sd in subdirs:
+            work.put(sd)
+
+    def worker():
+        while True:
+            d = work.get()
+            try:
+                if d is None:
+                    return
+                scan(d)
+            finally:
+                work.task_done()
+
+    def closer():
+        work.join()  # every queued directory has been scanned
+        for _ in range(workers):
+            work.put(None)
+        found.put(None)
+
+    work.put(root)
+    for _ in range(max(1, workers)):
+        threading.Thread(target=worker, daemon=True).start()
+    threading.Thread(target=closer, daemon=True).start()
+    while True:
+        gd = found.get()
+        if gd is None:
+            return
+        yield gd
+
+def discover_git_dirs_strict(root: str = DISCOVERY_ROOT) -> Iterator[str]:
+    """
+    Stream absolute .git paths under `root` (see iter_git_dirs), printing each one. Repos reached
+    again under another path (symlinked or bind-mounted trees) or nested in a seen repo are dropped.
+    """
+    print(f"[discovery] scanning {root} for .git directories ({DISCOVERY_WORKERS} threads)", file=sys.stderr)
+    n = 0
+    seen: set = set()
+    for p in iter_git_dirs(root):
+        real = os.path.realpath(repo_root_from_git_dir(p))
+        parent, anc = real, os.path.dirname(real)
+        while anc != parent and anc not in seen:
+            parent, anc = anc, os.path.dirname(anc)
+        if real in seen or anc in seen:
+            continue
+        seen.add(real)
+        n += 1
+        # Print each path to terminal
         print(p)
-    return out
+        yield p
+    print(f"[discovery] found {n} repos", file=sys.stderr)
 
 # ========================== Git helpers ==========================
 
+# Everything is read straight from the .git directory (config, refs, packed-refs): no `git` processes.
+
+GIT_SECTION_RE = re.compile(r'^(\S+)\s+"(.*)"$')  # [remote "origin"] -> remote.origin
+
 def repo_root_from_git_dir(git_dir: str) -> str:
-    gd = Path(git_dir)
-    if gd.is_dir() and gd.name == ".git":
-        return str(gd.parent)
-    try:
-        cp = subprocess.run(["git","-C", str(gd), "rev-parse", "--show-toplevel"],
-                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=False)
-        top = cp.stdout.strip()
-        if top:
-            return top
-    except Exception:
-        pass
-    return str(gd)
+    if os.path.basename(git_dir) == ".git":
+        return os.path.dirname(git_dir)
+    return git_dir
 
-def git_config_value(repo_root: str, key: str) -> Optional[str]:
+def _read_small(path: str) -> Optional[str]:
     try:
-        cp = subprocess.run(["git","-C", repo_root, "config", "--get", key],
-                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=False)
-        return cp.stdout.strip() or None
-    except Exception:
+        with open(path, encoding="utf-8", errors="replace") as fh:
+            return fh.read()
+    except OSError:
         return None
 
-def get_remote_url(repo_root: str) -> Optional[str]:
-    origin = git_config_value(repo_root, "remote.origin.url")
+def resolve_git_dir(dot_git: str) -> str:
+    """
+    The git directory holding config and refs for a discovered .git path. Worktrees and submodules
+    have a `.git` file (`gitdir: <path>`); linked worktrees also name their main repo in `commondir`.
+    """
+    gd = dot_git
+    if not os.path.isdir(gd):
+        text = _read_small(gd) or ""
+        if not text.startswith("gitdir:"):
+            return dot_git
+        gd = os.path.normpath(os.path.join(os.path.dirname(dot_git), text[len("gitdir:"):].strip()))
+    common = _read_small(os.path.join(gd, "commondir"))
+    if common and common.strip():
+        gd = os.path.normpath(os.path.join(gd, common.strip()))
+    return gd
+
+@lru_cache(maxsize=None)
+def read_git_config(git_dir: str) -> Dict[str, str]:
+    """Flattened .git/config, keyed like `git config` (e.g. "remote.origin.url")."""
+    # Git allows valueless keys (`[http] sslVerify`, meaning true) and trailing `#`/`;` comments.
+    cp = configparser.ConfigParser(strict=False, interpolation=None, allow_no_value=True,
+                                   inline_comment_prefixes=("#", ";"))
+    text = _read_small(os.path.join(git_dir, "config"))
+    if text is None:
+        return {}
+    try:
+        cp.read_string(text)
+    except configparser.Error:
+        pass  # keep whatever parsed: ParsingError is only raised once the whole file was read
+    out: Dict[str, str] = {}
+    for sect in cp.sections():
+        m = GIT_SECTION_RE.match(sect)
+        prefix = f"{m[1].lower()}.{m[2]}" if m else sect.lower()
+        for k, v in cp.items(sect):
+            out[f"{prefix}.{k}"] = "true" if v is None else v
+    return out
+
+def git_config_value(git_dir: str, key: str) -> Optional[str]:
+    return read_git_config(git_dir).get(key) or None
+
+def get_remote_url(git_dir: str) -> Optional[str]:
+    origin = git_config_value(git_dir, "remote.origin.url")
     if origin:
         return origin
-    try:
-        cp = subprocess.run(["git","-C", repo_root, "remote","-v"],
-                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=False)
-        for line in cp.stdout.splitlines():
-            parts = line.split()
-            if len(parts) >= 2:
-                return parts[1]
-    except Exception:
-        pass
+    # like the first line of `git remote -v`: remotes in name order
+    for k, v in sorted(read_git_config(git_dir).items()):
+        if k.startswith("remote.") and k.endswith(".url") and v:
+            return v
     return None
 
-def get_default_branch(repo_root: str) -> Optional[str]:
-    try:
-        cp = subprocess.run(["git","-C", repo_root, "symbolic-ref", "refs/remotes/origin/HEAD"],
-                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=False)
-        ref = cp.stdout.strip()
-        if ref and "/" in ref:
+def get_default_branch(git_dir: str) -> Optional[str]:
+    head = _read_small(os.path.join(git_dir, "refs", "remotes", "origin", "HEAD"))
+    if head and head.startswith("ref:"):
+        ref = head[4:].strip()
+        if "/" in ref:
             return ref.split("/")[-1]
-    except Exception:
-        pass
+    packed = set()
+    for line in (_read_small(os.path.join(git_dir, "packed-refs")) or "").splitlines():
+        parts = line.split()
+        if len(parts) == 2 and not line.startswith(("#", "^")):
+            packed.add(parts[1])
     for b in ("main","master"):
-        try:
-            cp = subprocess.run(["git","-C", repo_root, "show-ref", "--verify", f"refs/heads/{b}"],
-                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=False)
-            if cp.returncode == 0:
-                return b
-        except Exception:
-            pass
+        if os.path.isfile(os.path.join(git_dir, "refs", "heads", b)) or f"refs/heads/{b}" in packed:
+            return b
     return None
 
 # ========================== File walk & parsers ==========================
 
-def should_skip_dir(dirname: str) -> bool:
-    return os.path.basename(dirname) in DEFAULT_IGNORE_DIRS
+def _ext(name: str) -> str:
+    # Same result as Path(name).suffix.lower(), without building a Path
+    i = name.rfind(".")
+    return name[i:].lower() if 0 < i < len(name) - 1 else ""
 
-def looks_binary(path: str) -> bool:
-    return Path(path).suffix.lower() in BINARY_EXTS
+def list_repo_files(repo_root: str, follow_symlinks: bool) -> Iterator[os.DirEntry]:
+    """Yield DirEntry objects for files with a CODE_EXTS extension; nothing else is ever stat'd or opened."""
+    stack = [repo_root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for e in it:
+                    name = e.name
+                    if name in _FROZEN_IGNORE:  # .git, node_modules, ...: dropped before any other check
+                        continue
+                    try:
+                        is_dir = e.is_dir()
+                    except OSError:
+                        continue
+                    if not is_dir:
+                        if _ext(name) in CODE_EXTS:
+                            yield e
+                    elif follow_symlinks or not e.is_symlink():
+                        stack.append(e.path)
+        except OSError:
+            continue
 
-def list_repo_files(repo_root: str, follow_symlinks: bool) -> Iterable[str]:
-    for root, dirs, files in os.walk(repo_root, followlinks=follow_symlinks):
-        dirs[:] = [d for d in dirs if not should_skip_dir(d)]
-        for f in files:
-            yield os.path.join(root, f)
+Buffer = Union[bytes, mmap.mmap]
 
-def safe_read_text(path: str, max_bytes: int) -> Optional[str]:
+UTF16_BOMS = (b"\xff\xfe", b"\xfe\xff")
+
+def read_source(entry: os.DirEntry, max_bytes: int) -> Optional[Buffer]:
+    """
+    Raw file contents: an mmap for files of MMAP_MIN_BYTES and up (caller closes it), bytes otherwise.
+    The analyzers work on UTF-8 bytes directly, so nothing is decoded up front; the only exception
+    is a UTF-16 file (BOM-marked), which is transcoded to UTF-8 once here.
+    """
     try:
-        p = Path(path)
-        if p.is_symlink():
+        if entry.is_symlink():
             return None
-        if p.stat().st_size > max_bytes:
+        size = entry.stat(follow_symlinks=False).st_size
+        if size > max_bytes:
             return None
-        with open(p, "rb") as fh:
-            data = fh.read()
-        try:
-            return data.decode("utf-8")
-        except UnicodeDecodeError:
-            for enc in ("utf-16","latin-1"):
-                try:
-                    return data.decode(enc)
-                except Exception:
-                    continue
+        with open(entry.path, "rb") as fh:
+            if size >= MMAP_MIN_BYTES:
+                buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)  # the mapping outlives fh
+            else:
+                buf = fh.read()
+        if buf[:2] in UTF16_BOMS:
+            data = bytes(buf)
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+            return data.decode("utf-16", "replace").encode("utf-8")
+        return buf
     except Exception:
         return None
-    return None
+
+COUNT_CHUNK = 1 << 20
+
+def count_lines(buf: Buffer) -> int:
+    if isinstance(buf, bytes):
+        return buf.count(b"\n") + 1
+    # mmap has no count(): count per slice so the scan stays in C and only one chunk is copied at a time
+    return sum(buf[i:i + COUNT_CHUNK].count(b"\n") for i in range(0, len(buf), COUNT_CHUNK)) + 1
+
+def _s(b: bytes) -> str:
+    return b.decode("utf-8", "replace")
+
+def has_anchor(src: Buffer, anchors: Tuple[bytes, ...]) -> bool:
+    """
+    Cheap pre-screen: every pattern of a language needs at least one of its anchor literals, so a
+    file containing none of them cannot produce symbols. find() is a C-level search on bytes and mmap.
+    """
+    return any(src.find(k) != -1 for k in anchors)
+
+def _no_symbols() -> Dict:
+    return {"functions": [], "classes": [], "imports": []}
 
 # ---- lightweight symbol extraction ----
 
-def analyze_python(src: str) -> Dict:
-    out = {"functions": [], "classes": [], "imports": []}
+PY_BLOCK_FIELDS = ("body", "handlers", "orelse", "finalbody")  # source order of a try statement
+PY_ANCHORS = (b"def", b"class", b"import")
+
+def analyze_python(src: Buffer) -> Dict:
+    out = _no_symbols()
+    if not has_anchor(src, PY_ANCHORS):
+        return out  # skips ast.parse entirely
     try:
-        t = ast.parse(src)
-        for node in ast.walk(t):
+        t = ast.parse(src)  # bytes: honours a BOM / PEP 263 coding cookie
+        # Module- and class-level statements only; function bodies are never entered. Blocks such as
+        # `if TYPE_CHECKING:` or `try: import x` are opened so guarded imports/defs still count. Children are
+        # pushed reversed so symbols come out in source order.
+        stack = t.body[::-1]
+        while stack:
+            node = stack.pop()
             if isinstance(node, ast.FunctionDef):
                 out["functions"].append(node.name)
             elif isinstance(node, ast.AsyncFunctionDef):
                 out["functions"].append(node.name + " (async)")
             elif isinstance(node, ast.ClassDef):
                 out["classes"].append(node.name)
+                stack.extend(reversed(node.body))
             elif isinstance(node, ast.Import):
                 out["imports"].extend([a.name for a in node.names])
             elif isinstance(node, ast.ImportFrom):
                 mod = node.module or ""
                 out["imports"].append(mod)
+            else:
+                for f in reversed(PY_BLOCK_FIELDS):
+                    stack.extend(reversed(getattr(node, f, ())))
     except Exception:
         pass
     return out
 
-RE_FUNC_JS = re.compile(r"\bfunction\s+([A-Za-z0-9_]+)\s*\(|\b([A-Za-z0-9_]+)\s*=\s*\([^)]*\)\s*=>", re.MULTILINE)
-RE_CLASS_JS = re.compile(r"\bclass\s+([A-Za-z0-9_]+)\b")
-RE_IMPORT_JS = re.compile(r"\bimport\s+(?:.+?\s+from\s+)?['\"]([^'\"]+)['\"]", re.MULTILINE)
-
-def analyze_js_ts(src: str) -> Dict:
-    funcs = []
-    for m in RE_FUNC_JS.finditer(src):
-        name = m.group(1) or m.group(2)
-        if name: funcs.append(name)
-    classes = RE_CLASS_JS.findall(src)
-    imports = RE_IMPORT_JS.findall(src)
+# Patterns are bytes patterns run directly over the file buffer; captured names are decoded as they are
+# collected. One fused pattern per language: a single scan of the source, dispatched on m.lastgroup.
+# With hyperscan available, the same alternatives are also compiled into one SIMD automaton that
+# tells which of them occur in a file at all; `re` then runs with only those (see scan_matches).
+
+_HS_LOCAL = threading.local()
+
+def _fuse(parts: Iterable[bytes]) -> "re.Pattern":
+    return re.compile(b"|".join(parts), re.MULTILINE)
+
+@lru_cache(maxsize=None)
+def _fuse_subset(parts: Tuple[bytes, ...]) -> "re.Pattern":
+    return _fuse(parts)
+
+def _hs_database(parts: List[bytes]):
+    if hyperscan is None:
+        return None
+    exprs = [re.sub(rb"\(\?P<\w+>", b"(", p) for p in parts]  # hyperscan has no named groups
+    try:
+        db = hyperscan.Database()
+        db.compile(expressions=exprs, ids=list(range(len(exprs))), elements=len(exprs),
+                   flags=[hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_SINGLEMATCH] * len(exprs))
+        return db
+    except Exception as e:
+        print(f"[warn] hyperscan unavailable, using re only: {e}", file=sys.stderr)
+        return None
+
+def _hs_hits(db, data: Buffer) -> set:
+    # Scratch space is per thread: analyze_repo scans files from several threads at once.
+    scratches = getattr(_HS_LOCAL, "scratches", None)
+    if scratches is None:
+        scratches = _HS_LOCAL.scratches = {}
+    scratch = scratches.get(id(db))
+    if scratch is None:
+        scratch = scratches[id(db)] = hyperscan.Scratch(db)
+    hits = set()
+    db.scan(data, match_event_handler=lambda i, _start, _end, _flags, _ctx: hits.add(i), scratch=scratch)
+    return hits
+
+def scan_matches(parts: List[bytes], rx: "re.Pattern", db, src: Buffer) -> Iterator["re.Match"]:
+    """
+    Same matches as rx.finditer(src). Alternatives that hyperscan finds nowhere in the file can never
+    match, so they are dropped from the pattern (and the scan skipped when none are left).
+    """
+    if db is None:
+        return rx.finditer(src)
+    hits = _hs_hits(db, src)
+    if not hits:
+        return iter(())
+    if len(hits) == len(parts):
+        return rx.finditer(src)
+    return _fuse_subset(tuple(p for i, p in enumerate(parts) if i in hits)).finditer(src)
+
+JS_PARTS = [
+    rb"\bfunction\s+(?P<func>[A-Za-z0-9_]+)\s*\(",
+    rb"\b(?P<arrow>[A-Za-z0-9_]+)\s*=\s*\([^)]*\)\s*=>",
+    rb"\bclass\s+(?P<cls>[A-Za-z0-9_]+)\b",
+    rb"\bimport\s+(?:.+?\s+from\s+)?['\"](?P<imp>[^'\"]+)['\"]",
+]
+RE_JS_ALL = _fuse(JS_PARTS)
+HS_JS_ALL = _hs_database(JS_PARTS)
+JS_ANCHORS = (b"function", b"=>", b"class", b"import")
+
+def analyze_js_ts(src: Buffer) -> Dict:
+    if not has_anchor(src, JS_ANCHORS):
+        return _no_symbols()
+    funcs, classes, imports = [], [], []
+    for m in scan_matches(JS_PARTS, RE_JS_ALL, HS_JS_ALL, src):
+        kind = m.lastgroup
+        if kind == "cls":
+            classes.append(_s(m["cls"]))
+        elif kind == "imp":
+            imports.append(_s(m["imp"]))
+        else:
+            funcs.append(_s(m[kind]))
     return {"functions": funcs, "classes": classes, "imports": imports}
 
-RE_FUNC_GO = re.compile(r"\bfunc\s+(?:\([^)]+\)\s*)?([A-Za-z0-9_]+)\s*\(", re.MULTILINE)
-RE_IMPORT_GO = re.compile(r"\bimport\s+(?:\(\s*([^)]*?)\s*\)|\"([^\"]+)\")", re.MULTILINE)
-
-def analyze_go(src: str) -> Dict:
-    funcs = RE_FUNC_GO.findall(src)
-    im = []
-    for m in RE_IMPORT_GO.finditer(src):
-        block, single = m.groups()
-        if block:
-            for line in block.splitlines():
-                q = line.strip().strip('"')
-                if q: im.append(q)
-        elif single:
-            im.append(single)
+GO_PARTS = [
+    rb"\bfunc\s+(?:\([^)]+\)\s*)?(?P<func>[A-Za-z0-9_]+)\s*\(",
+    rb"\bimport\s+(?:\(\s*(?P<block>[^)]*?)\s*\)|\"(?P<single>[^\"]+)\")",
+]
+RE_GO_ALL = _fuse(GO_PARTS)
+HS_GO_ALL = _hs_database(GO_PARTS)
+GO_ANCHORS = (b"func", b"import")
+
+def analyze_go(src: Buffer) -> Dict:
+    if not has_anchor(src, GO_ANCHORS):
+        return _no_symbols()
+    funcs, im = [], []
+    for m in scan_matches(GO_PARTS, RE_GO_ALL, HS_GO_ALL, src):
+        kind = m.lastgroup
+        if kind == "func":
+            funcs.append(_s(m["func"]))
+        elif kind == "block":
+            for line in m["block"].splitlines():
+                q = line.strip().strip(b'"')
+                if q: im.append(_s(q))
+        elif kind == "single":
+            im.append(_s(m["single"]))
     return {"functions": funcs, "classes": [], "imports": im}
 
-RE_CLASS_JAVA = re.compile(r"\b(class|interface|enum)\s+([A-Za-z0-9_]+)")
-RE_METHOD_JAVA = re.compile(r"\b(?:public|private|protected|static|\s)+\s*[A-Za-z0-9_<>\[\]]+\s+([A-Za-z0-9_]+)\s*\(", re.MULTILINE)
-RE_IMPORT_JAVA = re.compile(r"\bimport\s+([A-Za-z0-9_.]+);")
-
-def analyze_java_like(src: str) -> Dict:
-    classes = [m[1] for m in RE_CLASS_JAVA.findall(src)]
-    funcs = RE_METHOD_JAVA.findall(src)
-    imports = RE_IMPORT_JAVA.findall(src)
+# Kept out of the fused pattern: the method alternative can start on the whitespace before
+# "class Foo(" (Kotlin primary constructors) and would swallow the class match.
+RE_JAVA_CLASS = re.compile(rb"\b(?:class|interface|enum)\s+([A-Za-z0-9_]+)")
+JAVA_PARTS = [
+    rb"\bimport\s+(?P<imp>[A-Za-z0-9_.]+);",
+    rb"\b(?:public|private|protected|static|\s)+\s*[A-Za-z0-9_<>\[\]]+\s+(?P<func>[A-Za-z0-9_]+)\s*\(",
+]
+RE_JAVA_ALL = _fuse(JAVA_PARTS)
+HS_JAVA_ALL = _hs_database(JAVA_PARTS)
+JAVA_ANCHORS = (b"(", b"class", b"interface", b"enum", b"import")  # methods need no keyword, only "("
+
+def analyze_java_like(src: Buffer) -> Dict:
+    if not has_anchor(src, JAVA_ANCHORS):
+        return _no_symbols()
+    funcs, imports = [], []
+    classes = [_s(c) for c in RE_JAVA_CLASS.findall(src)]
+    for m in scan_matches(JAVA_PARTS, RE_JAVA_ALL, HS_JAVA_ALL, src):
+        if m.lastgroup == "func":
+            funcs.append(_s(m["func"]))
+        else:
+            imports.append(_s(m["imp"]))
     return {"functions": funcs, "classes": classes, "imports": imports}
 
-RE_FUNC_C = re.compile(r"^[A-Za-z_][A-Za-z0-9_*\s]*\s+([A-Za-z_][A-Za-z0-9_]*)\s*\([^;{]*\)\s*{", re.MULTILINE)
-def analyze_c_cpp(src: str) -> Dict:
-    funcs = RE_FUNC_C.findall(src)
+RE_FUNC_C = re.compile(rb"^[A-Za-z_][A-Za-z0-9_*\s]*\s+([A-Za-z_][A-Za-z0-9_]*)\s*\([^;{]*\)\s*{", re.MULTILINE)
+def analyze_c_cpp(src: Buffer) -> Dict:
+    if not has_anchor(src, (b"(",)):
+        return _no_symbols()
+    funcs = [_s(f) for f in RE_FUNC_C.findall(src)]
     return {"functions": funcs, "classes": [], "imports": []}
 
-RE_FUNC_SH = re.compile(r"^\s*([A-Za-z0-9_]+)\s*\(\)\s*{", re.MULTILINE)
-def analyze_shell(src: str) -> Dict:
-    funcs = RE_FUNC_SH.findall(src)
+RE_FUNC_SH = re.compile(rb"^\s*([A-Za-z0-9_]+)\s*\(\)\s*{", re.MULTILINE)
+def analyze_shell(src: Buffer) -> Dict:
+    if not has_anchor(src, (b"()",)):
+        return _no_symbols()
+    funcs = [_s(f) for f in RE_FUNC_SH.findall(src)]
     return {"functions": funcs, "classes": [], "imports": []}
 
+EXT_TO_ANALYZER: Dict[str, Callable[[Buffer], Dict]] = {
+    ".py": analyze_python,
+    **dict.fromkeys((".js",".mjs",".cjs",".jsx",".ts",".tsx"), analyze_js_ts),
+    ".go": analyze_go,
+    **dict.fromkeys((".java",".kt",".kts"), analyze_java_like),
+    **dict.fromkeys((".c",".h",".hpp",".hh",".cc",".cpp",".cxx"), analyze_c_cpp),
+    **dict.fromkeys((".sh",".bash",".zsh"), analyze_shell),
+}
+
+# ---- tree-sitter symbol extraction (preferred when the grammar is installed) ----
+
+_TS_JS_QUERY = """
+(function_declaration name: (identifier) @func)
+(generator_function_declaration name: (identifier) @func)
+(method_definition name: (_) @func)
+(variable_declarator name: (identifier) @func value: [(arrow_function) (function_expression)])
+(class_declaration name: (_) @cls)
+(import_statement source: (string (string_fragment) @imp))
+"""
+
+# grammar -> (module, language function, query); captures are @func, @cls and @imp
+TS_GRAMMARS: Dict[str, Tuple[str, str, str]] = {
+    "javascript": ("tree_sitter_javascript", "language", _TS_JS_QUERY),
+    "typescript": ("tree_sitter_typescript", "language_typescript",
+                   _TS_JS_QUERY + "(abstract_class_declaration name: (_) @cls)"),
+    "tsx": ("tree_sitter_typescript", "language_tsx",
+            _TS_JS_QUERY + "(abstract_class_declaration name: (_) @cls)"),
+    "go": ("tree_sitter_go", "language", """
+(function_declaration name: (identifier) @func)
+(method_declaration name: (field_identifier) @func)
+(import_spec path: (_ (interpreted_string_literal_content) @imp))
+"""),
+    "java": ("tree_sitter_java", "language", """
+(class_declaration name: (identifier) @cls)
+(interface_declaration name: (identifier) @cls)
+(enum_declaration name: (identifier) @cls)
+(method_declaration name: (identifier) @func)
+(import_declaration [(scoped_identifier) (identifier)] @imp)
+"""),
+    "cpp": ("tree_sitter_cpp", "language", """
+(function_definition declarator: (function_declarator declarator: (_) @func))
+(function_definition declarator: (pointer_declarator declarator: (function_declarator declarator: (_) @func)))
+(function_definition declarator: (pointer_declarator declarator: (pointer_declarator declarator: (function_declarator declarator: (_) @func))))
+(function_definition declarator: (reference_declarator (function_declarator declarator: (_) @func)))
+(class_specifier name: (_) @cls body: (_))
+"""),
+    "bash": ("tree_sitter_bash", "language", "(function_definition name: (word) @func)"),
+}
+
+# Kotlin has no grammar here and stays on the regex analyzer; C headers parse fine as C++.
+TS_LANG_BY_EXT: Dict[str, str] = {
+    **dict.fromkeys((".js",".mjs",".cjs",".jsx"), "javascript"),
+    ".ts": "typescript",
+    ".tsx": "tsx",
+    ".go": "go",
+    ".java": "java",
+    **dict.fromkeys((".c",".h",".hpp",".hh",".cc",".cpp",".cxx"), "cpp"),
+    **dict.fromkeys((".sh",".bash",".zsh"), "bash"),
+}
+
+_TS_LOCAL = threading.local()
+
+@lru_cache(maxsize=None)
+def _ts_grammar(name: str):
+    """(Language, Query) for a grammar, or None when tree-sitter or that grammar is unavailable."""
+    if Parser is None:
+        return None
+    module, fn, query = TS_GRAMMARS[name]
+    try:
+        lang = Language(getattr(importlib.import_module(module), fn)())
+        return lang, Query(lang, query)
+    except Exception:
+        return None
+
+def _ts_parser(name: str, lang) -> "Parser":
+    # Parsers are not thread-safe: one per thread per grammar.
+    parsers = getattr(_TS_LOCAL, "parsers", None)
+    if parsers is None:
+        parsers = _TS_LOCAL.parsers = {}
+    parser = parsers.get(name)
+    if parser is None:
+        parser = parsers[name] = Parser(lang)
+    return parser
+
+def _ts_captures(query, node) -> Dict[str, list]:
+    """Captured nodes per capture name, in source order (the query returns them grouped by pattern)."""
+    caps = QueryCursor(query).captures(node) if QueryCursor is not None else query.captures(node)
+    if not isinstance(caps, dict):
+        out: Dict[str, list] = {}  # tree_sitter < 0.23: [(node, name), ...]
+        for n, name in caps:
+            out.setdefault(name, []).append(n)
+        caps = out
+    return {name: sorted(nodes, key=lambda n: n.start_byte) for name, nodes in caps.items()}
+
+def analyze_tree_sitter(src: Buffer, ext: str) -> Optional[Dict]:
+    """Symbols from one C-level parse and query; None when no grammar is available for `ext`."""
+    name = TS_LANG_BY_EXT.get(ext)
+    grammar = _ts_grammar(name) if name else None
+    if grammar is None:
+        return None
+    lang, query = grammar
+    tree = _ts_parser(name, lang).parse(src)
+    caps = _ts_captures(query, tree.root_node)
+    out = _no_symbols()
+    out["functions"] = [_s(n.text) for n in caps.get("func", ())]
+    out["classes"] = [_s(n.text) for n in caps.get("cls", ())]
+    out["imports"] = [_s(n.text) for n in caps.get("imp", ())]
+    if name == "java":  # the captured name stops before the `.*` of a wildcard import
+        out["imports"] = [i + ".*" if n.next_named_sibling is not None and n.next_named_sibling.type == "asterisk" else i
+                          for i, n in zip(out["imports"], caps.get("imp", ()))]
+    return out
+
 # ========================== Dependency sniffers ==========================
 
+MANIFEST_HEAD_BYTES = 50_000
+
+def _head(p: Path, n: int = MANIFEST_HEAD_BYTES) -> Optional[str]:
+    # Bounded read: lockfiles and pom.xml files can be megabytes, only the head is ever kept.
+    try:
+        with p.open("rb") as fh:
+            return fh.read(n).decode("utf-8", "ignore")
+    except OSError:
+        return None
+
 def read_package_manifests(repo_root: str) -> Dict[str, Dict]:
     res: Dict[str, Dict] = {}
     # Python
     for fn in ("requirements.txt","pyproject.toml","Pipfile","environment.yml"):
-        p = Path(repo_root, fn)
-        if p.exists():
-            res[fn] = {"content": (p.read_text(errors="ignore")[:50_000])}
+        head = _head(Path(repo_root, fn))
+        if head is not None:
+            res[fn] = {"content": head}
     # Node
-    pjson = Path(repo_root, "package.json")
-    if pjson.exists():
+    head = _head(Path(repo_root, "package.json"))
+    if head is not None:
         try:
-            res["package.json"] = json.loads(pjson.read_text(errors="ignore"))
+            if not head.rstrip().endswith("}"):
+                raise ValueError("truncated")  # cut off at MANIFEST_HEAD_BYTES
+            res["package.json"] = json.loads(head)
         except Exception:
-            res["package.json"] = {"content": pjson.read_text(errors="ignore")[:50_000]}
+            res["package.json"] = {"content": head}
     # Go
     for fn in ("go.mod","go.sum"):
-        p = Path(repo_root, fn)
-        if p.exists():
-            res[fn] = {"content": p.read_text(errors="ignore")[:50_000]}
+        head = _head(Path(repo_root, fn))
+        if head is not None:
+            res[fn] = {"content": head}
     # Java/Gradle/Maven
     for fn in ("build.gradle","build.gradle.kts","settings.gradle","pom.xml"):
-        p = Path(repo_root, fn)
-        if p.exists():
-            res[fn] = {"content": p.read_text(errors="ignore")[:50_000]}
+        head = _head(Path(repo_root, fn))
+        if head is not None:
+            res[fn] = {"content": head}
     # Swift/Apple
     for fn in ("Package.swift","Podfile","Cartfile"):
-        p = Path(repo_root, fn)
-        if p.exists():
-            res[fn] = {"content": p.read_text(errors="ignore")[:50_000]}
+        head = _head(Path(repo_root, fn))
+        if head is not None:
+            res[fn] = {"content": head}
     return res
 
 # ========================== Analyzer ==========================
 
-def analyze_file(path: str) -> Optional[Tuple[str, Dict]]:
-    ext = Path(path).suffix.lower()
-    if SKIP_BINARIES and looks_binary(path):
+def analyze_file(entry: os.DirEntry) -> Optional[Tuple[str, Dict]]:
+    ext = _ext(entry.name)
+    fn = EXT_TO_ANALYZER.get(ext)
+    if fn is None:
         return None
-    if ext not in CODE_EXTS:
-        return None
-    src = safe_read_text(path, MAX_BYTES)
+    src = read_source(entry, MAX_BYTES)
     if src is None:
         return None
 
-    if ext == ".py":
-        info = analyze_python(src)
-    elif ext in {".js",".mjs",".cjs",".jsx",".ts",".tsx"}:
-        info = analyze_js_ts(src)
-    elif ext == ".go":
-        info = analyze_go(src)
-    elif ext in {".java",".kt",".kts"}:
-        info = analyze_java_like(src)
-    elif ext in {".c",".h",".hpp",".hh",".cc",".cpp",".cxx"}:
-        info = analyze_c_cpp(src)
-    elif ext in {".sh",".bash",".zsh"}:
-        info = analyze_shell(src)
-    else:
-        return None
-
-    info["lines"] = src.count("\n") + 1
-    return path, info
+    try:
+        info = analyze_tree_sitter(src, ext) if USE_TREE_SITTER and ext in TS_LANG_BY_EXT else None
+        if info is None:
+            info = fn(src)
+        info["lines"] = count_lines(src)
+    finally:
+        if isinstance(src, mmap.mmap):
+            src.close()
+    return entry.path, info
 
 def summarize_symbols(per_file: Dict[str, Dict]) -> Dict[str, int]:
     totals = {"files": 0, "lines": 0, "functions": 0, "classes": 0}
@@ -308,96 +696,199 @@ def summarize_symbols(per_file: Dict[str, Dict]) -> Dict[str, int]:
         totals["classes"] += len(meta.get("classes", []))
     return totals
 
-def write_repo_report(outdir: Path, repo_name: str, repo_root: str, remote: Optional[str],
-                      default_branch: Optional[str], totals: Dict[str,int],
-                      per_file: Dict[str, Dict], manifests: Dict[str, Dict]) -> str:
+# Reports are two-stage: analyze_repo writes a compact JSONL artifact per repo (a header record with
+# the repo metadata, totals and manifests, then one record per file, sorted by path), and
+# render_markdown turns it into the Markdown report afterwards, off the parallel analysis path.
+
+def _jsonl(obj) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj) + b"\n"
+        except TypeError:  # e.g. an integer beyond 64 bits or a lone surrogate in a parsed manifest
+            pass
+    return json.dumps(obj).encode("ascii") + b"\n"  # ASCII escapes keep lone surrogates encodable
+
+def _from_jsonl(line: bytes):
+    if orjson is not None:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:  # \ud800-style escapes written by the json fallback above
+            pass
+    return json.loads(line)
+
+def write_repo_jsonl(outdir: Path, repo_name: str, repo_root: str, remote: Optional[str],
+                     default_branch: Optional[str], totals: Dict[str,int],
+                     per_file: Dict[str, Dict], manifests: Dict[str, Dict]) -> str:
     outdir.mkdir(parents=True, exist_ok=True)
-    md_path = outdir / f"{repo_name}.md"
-    rel = lambda p: str(Path(p).resolve()).replace(str(Path(repo_root).resolve()) + os.sep, "")
-
-    def fmt_symbols(lst: List[str], max_show=20):
-        if not lst: return "_none_"
-        shown = ", ".join(sorted(lst)[:max_show])
-        more = len(lst) - min(len(lst), max_show)
-        return shown + (f" …(+{more})" if more > 0 else "")
-
-    lines = []
-    lines.append(f"# {repo_name}\n")
-    lines.append(f"- **Path:** `{repo_root}`")
-    if remote: lines.append(f"- **Remote:** `{remote}`")
-    if default_branch: lines.append(f"- **Default branch (heuristic):** `{default_branch}`")
-    lines.append("")
-    lines.append("## Summary")
-    lines.append(f"- Files analyzed: **{totals['files']}**")
-    lines.append(f"- Total LOC (approx): **{totals['lines']}**")
-    lines.append(f"- Functions found: **{totals['functions']}**")
-    lines.append(f"- Classes found: **{totals['classes']}**")
-    lines.append("")
-    if manifests:
-        lines.append("## Dependency manifests (snippets or parsed):")
-        for k, _ in manifests.items():
-            lines.append(f"- `{k}`")
-    else:
-        lines.append("## Dependency manifests")
-        lines.append("_none found_")
-    lines.append("")
-
-    lines.append("## Files")
-    for fpath, meta in sorted(per_file.items()):
-        relp = rel(fpath)
-        funcs = meta.get("functions", [])
-        classes = meta.get("classes", [])
-        imps = meta.get("imports", [])
-
-        lines.append(f"### `{relp}`")
-        lines.append(f"- ~{meta.get('lines', 0)} lines")
-        if funcs: lines.append(f"- Functions: {fmt_symbols(funcs)}")
-        if classes: lines.append(f"- Classes: {fmt_symbols(classes)}")
-        if imps: lines.append(f"- Imports: {fmt_symbols(imps)}")
-        lines.append("")
-
-    if manifests:
-        lines.append("## Manifest Contents (truncated)")
-        for k, v in manifests.items():
-            lines.append(f"### `{k}`")
-            if isinstance(v, dict) and "content" in v:
-                snippet = v["content"]
-                lines.append("```")
-                lines.append(snippet[:4000])
-                lines.append("```")
+    jsonl_path = outdir / f"{repo_name}.jsonl"
+    # per_file keys are repo_root-joined paths from the walker, so a plain prefix strip is enough
+    prefix = repo_root.rstrip(os.sep) + os.sep
+    with jsonl_path.open("wb", buffering=1 << 20) as fh:
+        fh.write(_jsonl({"name": repo_name, "root": repo_root, "remote": remote,
+                         "default_branch": default_branch, "totals": totals, "manifests": manifests}))
+        for fpath, meta in sorted(per_file.items()):
+            fh.write(_jsonl({"path": fpath.removeprefix(prefix), **meta}))
+    return str(jsonl_path)
+
+def fmt_symbols(lst: List[str], max_show=20):
+    if not lst: return "_none_"
+    shown = ", ".join(sorted(lst)[:max_show])
+    more = len(lst) - min(len(lst), max_show)
+    return shown + (f" …(+{more})" if more > 0 else "")
+
+def render_markdown(jsonl_path: str) -> str:
+    """Render <repo>.md next to a write_repo_jsonl artifact, streaming the file records."""
+    md_path = Path(jsonl_path).with_suffix(".md")
+    with open(jsonl_path, "rb") as src:
+        # orjson silently reads integers beyond 64 bits as floats; the header carries the parsed manifests
+        head = json.loads(src.readline())
+        repo_name, repo_root = head["name"], head["root"]
+        remote, default_branch = head["remote"], head["default_branch"]
+        totals, manifests = head["totals"], head["manifests"]
+        per_file = (_from_jsonl(line) for line in src)
+
+        # Streamed straight to disk; the large buffer keeps it to a handful of write syscalls.
+        with md_path.open("w", buffering=1 << 20) as fh:
+            w = fh.write
+            w(f"# {repo_name}\n\n")
+            w(f"- **Path:** `{repo_root}`\n")
+            if remote: w(f"- **Remote:** `{remote}`\n")
+            if default_branch: w(f"- **Default branch (heuristic):** `{default_branch}`\n")
+            w("\n")
+            w("## Summary\n")
+            w(f"- Files analyzed: **{totals['files']}**\n")
+            w(f"- Total LOC (approx): **{totals['lines']}**\n")
+            w(f"- Functions found: **{totals['functions']}**\n")
+            w(f"- Classes found: **{totals['classes']}**\n")
+            w("\n")
+            if manifests:
+                w("## Dependency manifests (snippets or parsed):\n")
+                for k in manifests:
+                    w(f"- `{k}`\n")
             else:
-                try:
-                    lines.append("```json")
-                    lines.append(json.dumps(v, indent=2)[:4000])
-                    lines.append("```")
-                except Exception:
-                    lines.append("```")
-                    lines.append(str(v)[:4000])
-                    lines.append("```")
-
-    md_path.write_text("\n".join(lines))
+                w("## Dependency manifests\n")
+                w("_none found_\n")
+            w("\n")
+
+            w("## Files\n")
+            for meta in per_file:
+                funcs = meta.get("functions", [])
+                classes = meta.get("classes", [])
+                imps = meta.get("imports", [])
+
+                w(f"### `{meta['path']}`\n")
+                w(f"- ~{meta.get('lines', 0)} lines\n")
+                if funcs: w(f"- Functions: {fmt_symbols(funcs)}\n")
+                if classes: w(f"- Classes: {fmt_symbols(classes)}\n")
+                if imps: w(f"- Imports: {fmt_symbols(imps)}\n")
+                w("\n")
+
+            if manifests:
+                w("## Manifest Contents (truncated)\n")
+                for k, v in manifests.items():
+                    w(f"### `{k}`\n")
+                    if isinstance(v, dict) and "content" in v:
+                        w(f"```\n{v['content'][:4000]}\n```\n")
+                    else:
+                        try:
+                            w(f"```json\n{json.dumps(v, indent=2)[:4000]}\n```\n")
+                        except Exception:
+                            w(f"```\n{str(v)[:4000]}\n```\n")
+
     return str(md_path)
 
+# ========================== Analysis cache ==========================
+# Per-file results keyed by path and validated by (size, mtime_ns) and the analyzer backend that produced
+# them: unchanged files are never reopened.
+
+CACHE_DB = Path.home() / ".cache" / "repo_intel" / "cache.sqlite"
+CACHE_SCHEMA = 6             # bump whenever analyzer output changes; older rows are dropped
+
+@lru_cache(maxsize=None)
+def cache_backend() -> str:
+    """Which analyzers produce results in this process: rows written by another backend never match."""
+    if not USE_TREE_SITTER:
+        return "regex"
+    grammars = sorted(n for n in TS_GRAMMARS if _ts_grammar(n) is not None)
+    return "ts:" + ",".join(grammars) if grammars else "regex"
+
+def open_cache(db_path: Path = CACHE_DB) -> Optional[sqlite3.Connection]:
+    try:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(db_path), timeout=30)  # worker processes share the file
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != CACHE_SCHEMA:
+            conn.execute("DROP TABLE IF EXISTS f")
+            conn.execute(f"PRAGMA user_version = {CACHE_SCHEMA}")
+        conn.execute("CREATE TABLE IF NOT EXISTS f(path TEXT PRIMARY KEY, size INT, mtime INT, backend TEXT, info BLOB)")
+        return conn
+    except (OSError, sqlite3.Error) as e:
+        print(f"[warn] analysis cache disabled: {e}", file=sys.stderr)
+        return None
+
+def load_cached(conn: sqlite3.Connection, repo_root: str) -> Dict[str, Tuple[int, int, str]]:
+    # One range scan over the primary key instead of a query per file
+    prefix = repo_root.rstrip(os.sep) + os.sep
+    upper = prefix[:-1] + chr(ord(os.sep) + 1)
+    try:
+        rows = conn.execute("SELECT path, size, mtime, info FROM f WHERE path >= ? AND path < ? AND backend = ?",
+                            (prefix, upper, cache_backend()))
+        return {p: (size, mtime, info) for p, size, mtime, info in rows}
+    except sqlite3.Error as e:
+        print(f"[warn] cache read failed for {repo_root}: {e}", file=sys.stderr)
+        return {}
+
+def store_cached(conn: sqlite3.Connection, rows: List[Tuple[str, int, int, str]]):
+    try:
+        with conn:  # one transaction per repo
+            backend = cache_backend()
+            conn.executemany("INSERT OR REPLACE INTO f VALUES (?, ?, ?, ?, ?)",
+                             ((p, size, mtime, backend, info) for p, size, mtime, info in rows))
+    except sqlite3.Error as e:
+        print(f"[warn] cache write failed: {e}", file=sys.stderr)
+
 # ========================== Orchestration ==========================
 
-def analyze_repo(git_dir: str) -> Optional[Dict]:
+def analyze_repo(git_dir: str, outdir: Path = OUT_DIR) -> Optional[Dict]:
     repo_root = repo_root_from_git_dir(git_dir)
     repo_name = Path(repo_root).name or Path(repo_root).parent.name
-    remote = get_remote_url(repo_root)
-    default_branch = get_default_branch(repo_root)
+    meta_dir = resolve_git_dir(git_dir)
+    remote = get_remote_url(meta_dir)
+    default_branch = get_default_branch(meta_dir)
 
-    per_file: Dict[str, Dict] = {}
-    for path in list_repo_files(repo_root, FOLLOW_SYMLINKS):
-        if SKIP_BINARIES and looks_binary(path):
-            continue
-        res = analyze_file(path)
+    conn = open_cache()
+    cached = load_cached(conn, repo_root) if conn else {}
+    fresh: List[Tuple[str, int, int, str]] = []
+
+    def analyze_cached(entry: os.DirEntry) -> Optional[Tuple[str, Dict]]:
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except OSError:
+            return None
+        hit = cached.get(entry.path)
+        if hit and hit[0] == st.st_size and hit[1] == st.st_mtime_ns:
+            return entry.path, json.loads(hit[2])
+        res = analyze_file(entry)
         if res:
-            p, info = res
-            per_file[p] = info
+            fresh.append((entry.path, st.st_size, st.st_mtime_ns, json.dumps(res[1])))
+        return res
+
+    per_file: Dict[str, Dict] = {}
+    entries = list(list_repo_files(repo_root, FOLLOW_SYMLINKS))
+    with ThreadPoolExecutor(max_workers=FILE_WORKERS) as ex:
+        for res in ex.map(analyze_cached, entries):
+            if res:
+                p, info = res
+                per_file[p] = info
+    if conn:
+        if fresh:
+            store_cached(conn, fresh)
+        conn.close()
 
     totals = summarize_symbols(per_file)
     manifests = read_package_manifests(repo_root)
-    report_path = write_repo_report(OUT_DIR, repo_name, repo_root, remote, default_branch, totals, per_file, manifests)
+    jsonl_path = write_repo_jsonl(outdir, repo_name, repo_root, remote, default_branch, totals, per_file, manifests)
 
     return {
         "name": repo_name,
@@ -409,46 +900,58 @@ def analyze_repo(git_dir: str) -> Optional[Dict]:
         "lines": totals["lines"],
         "functions": totals["functions"],
         "classes": totals["classes"],
-        "report": report_path,
+        "jsonl": jsonl_path,
+        "report": "",  # filled in once render_markdown has run
     }
 
 def write_index(rows: List[Dict], outdir: Path):
     outdir.mkdir(parents=True, exist_ok=True)
     path = outdir / "index.csv"
     cols = ["name","root","git_dir","remote","default_branch","files","lines","functions","classes","report"]
-    with open(path, "w", newline="") as fh:
-        w = csv.DictWriter(fh, fieldnames=cols)
-        w.writeheader()
-        for r in rows:
-            w.writerow(r)
+    with open(path, "w", newline="", buffering=1 << 20) as fh:
+        w = csv.writer(fh)
+        w.writerow(cols)
+        w.writerows([tuple(r[c] for c in cols) for r in rows])
     return str(path)
 
 def main():
     OUT_DIR.mkdir(parents=True, exist_ok=True)
 
-    # 1) Discover .git directories using the exact command
-    git_dirs: List[str] = discover_git_dirs_strict()
-    if not git_dirs:
-        print("\n[info] No .git directories returned by `find / ...`. On macOS, you may need to grant Terminal 'Full Disk Access' in System Settings → Privacy & Security → Full Disk Access.", file=sys.stderr)
-
-    # 2) Analyze each repo
+    # 1) Discover .git directories and 2) analyze each repo as soon as it is found
     results: List[Dict] = []
-    with ThreadPoolExecutor(max_workers=max(1, WORKERS)) as ex:
-        futs = {ex.submit(analyze_repo, gd): gd for gd in git_dirs}
+    # Worker processes sidestep the GIL; the module-level regexes are compiled once per worker on import.
+    # Workers come from a fork server (spawn where there is none), never a fork of this process, which has
+    # discovery threads running while the pool starts.
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    with ProcessPoolExecutor(max_workers=max(1, WORKERS), mp_context=ctx) as ex:
+        futs = {ex.submit(analyze_repo, gd, OUT_DIR): gd for gd in discover_git_dirs_strict()}
+        if not futs:
+            print(f"\n[info] No .git directories found under {DISCOVERY_ROOT}. On macOS, you may need to grant Terminal 'Full Disk Access' in System Settings → Privacy & Security → Full Disk Access.", file=sys.stderr)
         for fut in as_completed(futs):
             gd = futs[fut]
             try:
                 row = fut.result()
                 if row:
                     results.append(row)
-                    print(f"[report] {row['name']} -> {row['report']}", file=sys.stderr)
+                    print(f"[analyzed] {row['name']} -> {row['jsonl']}", file=sys.stderr)
             except Exception as e:
                 print(f"[warn] analysis failed for {gd}: {e}", file=sys.stderr)
 
-    # 3) Write index
+        # 3) Render the Markdown reports from the JSONL artifacts once all analysis is done
+        renders = {ex.submit(render_markdown, row["jsonl"]): row for row in results}
+        for fut in as_completed(renders):
+            row = renders[fut]
+            try:
+                row["report"] = fut.result()
+                print(f"[report] {row['name']} -> {row['report']}", file=sys.stderr)
+            except Exception as e:
+                print(f"[warn] rendering failed for {row['jsonl']}: {e}", file=sys.stderr)
+
+    # 4) Write index
     index_path = write_index(results, OUT_DIR)
     print(f"\nDone. Index: {index_path}")
-    print("Per-repo Markdown reports are in:", OUT_DIR)
+    print("Per-repo Markdown reports (and their JSONL sources) are in:", OUT_DIR)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,31 @@
+import ast
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import repo_function_deepdive
+
+
+def _spans(code: str):
+    v = repo_function_deepdive.FileVisitor(code)
+    v.visit(ast.parse(code))
+    return {name: src for name, (_, _, src) in v.spans.items()}
+
+
+class FileVisitorSpanTest(unittest.TestCase):
+    def test_segment_stops_at_end_col_offset(self):
+        code = "class A:\n    def m(self): return top(1); \n\ndef f(): return 2  # comment\n"
+        tree = ast.parse(code)
+        want = {n.name: ast.get_source_segment(code, n) for n in ast.walk(tree) if isinstance(n, ast.FunctionDef)}
+        self.assertEqual(_spans(code), want)
+
+    def test_non_ascii_byte_offsets(self):
+        code = "x = 'é'; y = 1\nif x:\n    def g(a='ü'): return 'ß'  # ok\n"
+        fn = next(n for n in ast.walk(ast.parse(code)) if isinstance(n, ast.FunctionDef))
+        self.assertEqual(_spans(code)["g"], ast.get_source_segment(code, fn))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import repo_intel3
+
+
+def _git_dir(config: str) -> str:
+    gd = os.path.join(tempfile.mkdtemp(), ".git")
+    os.makedirs(gd)
+    with open(os.path.join(gd, "config"), "w") as fh:
+        fh.write(config)
+    return gd
+
+
+class ReadGitConfigTest(unittest.TestCase):
+    def test_valueless_key_keeps_remote(self):
+        gd = _git_dir(
+            "[core]\n"
+            "\trepositoryformatversion = 0\n"
+            "\tbare = false\n"
+            "[http]\n"
+            "\tsslVerify\n"
+            '[remote "origin"]\n'
+            "\turl = https://example.com/a.git ; trailing comment\n"
+            "\tfetch = +refs/heads/*:refs/remotes/origin/*\n"
+        )
+        cfg = repo_intel3.read_git_config(gd)
+        self.assertEqual(cfg["http.sslverify"], "true")
+        self.assertEqual(repo_intel3.get_remote_url(gd), "https://example.com/a.git")
+
+    def test_parse_error_keeps_sections_read(self):
+        gd = _git_dir('[remote "origin"]\n\turl = https://example.com/b.git\n= stray\n')
+        self.assertEqual(repo_intel3.get_remote_url(gd), "https://example.com/b.git")
+
+
+class AnalyzeJavaLikeTest(unittest.TestCase):
+    def test_kotlin_primary_constructor_class(self):
+        info = repo_intel3.analyze_java_like(b"import kotlin.math.max\n\nclass Point(val x: Int)")
+        self.assertEqual(info["classes"], ["Point"])
+
+    def test_java_imports_and_methods(self):
+        info = repo_intel3.analyze_java_like(
+            b"import java.util.List;\n\npublic class Foo {\n"
+            b"    private List<String> names() { return null; }\n}\n"
+        )
+        self.assertEqual(info, {"functions": ["names"], "classes": ["Foo"], "imports": ["java.util.List"]})
+
+    @unittest.skipIf(repo_intel3._ts_grammar("java") is None, "tree-sitter Java grammar not installed")
+    def test_tree_sitter_java_imports(self):
+        info = repo_intel3.analyze_tree_sitter(
+            b"import staticutils.Helper;\nimport static org.junit.Assert.*;\nimport static a.B.c;\n", ".java"
+        )
+        self.assertEqual(info["imports"], ["staticutils.Helper", "org.junit.Assert.*", "a.B.c"])
+
+
+class AnalyzePythonTest(unittest.TestCase):
+    def test_symbols_in_source_order(self):
+        info = repo_intel3.analyze_python(
+            b"import a\nimport b\ndef f1(): pass\ndef f2(): pass\n"
+            b"class C:\n    def m1(self): pass\n    def m2(self): pass\n"
+            b"try:\n    import c\nexcept ImportError:\n    import d\nelse:\n    import e\nfinally:\n    import f\n"
+            b"def f3(): pass\n"
+        )
+        self.assertEqual(info, {"functions": ["f1", "f2", "m1", "m2", "f3"], "classes": ["C"],
+                                "imports": ["a", "b", "c", "d", "e", "f"]})
+
+
+class JsonlRoundTripTest(unittest.TestCase):
+    def test_wide_manifest_integer_renders_exactly(self):
+        outdir = Path(tempfile.mkdtemp())
+        root = str(outdir / "repo")
+        totals = {"files": 1, "lines": 3, "functions": 1, "classes": 0}
+        per_file = {os.path.join(root, "a.py"): {"functions": ["f"], "classes": [], "imports": [], "lines": 3}}
+        manifests = {"package.json": {"version": 2 ** 70}}
+        jsonl = repo_intel3.write_repo_jsonl(outdir, "repo", root, None, None, totals, per_file, manifests)
+        md = Path(repo_intel3.render_markdown(jsonl)).read_text()
+        self.assertIn(str(2 ** 70), md)
+        self.assertIn("### `a.py`", md)
+
+    def test_lone_surrogate_in_manifest_round_trips(self):
+        outdir = Path(tempfile.mkdtemp())
+        root = str(outdir / "repo")
+        totals = {"files": 1, "lines": 1, "functions": 0, "classes": 0}
+        per_file = {os.path.join(root, "a.py"): {"functions": [], "classes": [], "imports": [], "lines": 1}}
+        manifests = {"package.json": {"name": "x\ud800y"}}
+        jsonl = repo_intel3.write_repo_jsonl(outdir, "repo", root, None, None, totals, per_file, manifests)
+        md = Path(repo_intel3.render_markdown(jsonl)).read_text()
+        self.assertIn('"name": "x\\ud800y"', md)
+
+    def test_undecodable_path_reads_back(self):
+        line = repo_intel3._jsonl({"path": "x\udcff.py", "lines": 1})
+        self.assertEqual(repo_intel3._from_jsonl(line), {"path": "x\udcff.py", "lines": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()